@@ -0,0 +1,146 @@
+from __future__ import annotations
+import argparse
+import json
+import sys
+import weakref
+from datetime import date
+from typing import Dict, List, Optional, Union
+from sqlalchemy import column, table, text
+from sqlalchemy.engine import Connection, Engine
+
+# Cold storage for the history of executed requests, in a second SQLite file
+# ATTACHed to every connection as schema "archive" (see db.attach_archive).
+# One row per (request, month of execution) holds the request's whole history as
+# a JSON array of [id, at, department, from_status, to_status, comment]: no
+# per-entry rowid or secondary indexes, and the month key partitions the table
+# so old months can be dropped or copied out as ranges.
+history_archive = table("history_archive", column("request_op_id"), column("month"), column("entries"), schema="archive")
+
+ARCHIVE_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS archive.history_archive (
+        request_op_id VARCHAR NOT NULL,
+        month VARCHAR NOT NULL,
+        entries TEXT NOT NULL,
+        PRIMARY KEY (request_op_id, month)
+    ) WITHOUT ROWID
+    """,
+    "CREATE INDEX IF NOT EXISTS archive.ix_history_archive_month ON history_archive (month)",
+]
+
+# archived entries as history rows, for rebuilds that must see the full history
+ARCHIVED_HISTORY_SQL = """
+    SELECT json_extract(e.value, '$[0]') AS id, a.request_op_id AS request_op_id,
+           json_extract(e.value, '$[1]') AS at, json_extract(e.value, '$[2]') AS department,
+           json_extract(e.value, '$[3]') AS from_status, json_extract(e.value, '$[4]') AS to_status,
+           json_extract(e.value, '$[5]') AS comment
+    FROM archive.history_archive a, json_each(a.entries) e
+"""
+HOT_HISTORY_SQL = "SELECT id, request_op_id, at, department, from_status, to_status, comment FROM main.history"
+ALL_HISTORY_SQL = f"""(
+    {HOT_HISTORY_SQL}
+    UNION ALL {ARCHIVED_HISTORY_SQL}
+)"""
+
+# months of history kept in the hot table after a request is executed
+DEFAULT_KEEP_MONTHS = 6
+ARCHIVE_BATCH = 500
+
+def install_archive(dbapi_connection) -> None:
+    cursor = dbapi_connection.cursor()
+    for ddl in ARCHIVE_DDL:
+        cursor.execute(ddl)
+    cursor.close()
+
+def archive_attached(conn: Connection) -> bool:
+    # not attached for in-memory databases or engines built outside app.db
+    return any(row[1] == "archive" for row in conn.exec_driver_sql("PRAGMA database_list"))
+
+_ATTACHED: "weakref.WeakKeyDictionary[Engine, bool]" = weakref.WeakKeyDictionary()
+
+def has_archive(bind: Union[Engine, Connection]) -> bool:
+    """archive_attached, checked once per engine: db.attach_archive applies to all its connections or none."""
+    engine = bind if isinstance(bind, Engine) else bind.engine
+    attached = _ATTACHED.get(engine)
+    if attached is None:
+        if isinstance(bind, Engine):
+            with bind.connect() as conn:
+                attached = archive_attached(conn)
+        else:
+            attached = archive_attached(bind)
+        _ATTACHED[engine] = attached
+    return attached
+
+def full_history_sql(conn: Connection) -> str:
+    """ALL_HISTORY_SQL when the archive is attached, else the hot history table alone."""
+    return ALL_HISTORY_SQL if archive_attached(conn) else f"({HOT_HISTORY_SQL})"
+
+def month_start(months_ago: int, today: Optional[date] = None) -> str:
+    today = today or date.today()
+    index = today.year * 12 + today.month - 1 - months_ago
+    return f"{index // 12:04d}-{index % 12 + 1:02d}-01"
+
+def _archive_batch(conn: Connection, cutoff: str, limit: int) -> int:
+    targets = dict(conn.execute(text(
+        "SELECT op_id, substr(updated_at, 1, 7) FROM requests r "
+        "WHERE status = 'EXECUTED' AND updated_at < :cutoff "
+        "AND EXISTS (SELECT 1 FROM history h WHERE h.request_op_id = r.op_id) LIMIT :limit"
+    ), {"cutoff": cutoff, "limit": limit}).all())
+    if not targets:
+        return 0
+    params = {f"p{i}": op_id for i, op_id in enumerate(targets)}
+    in_list = ", ".join(f":{k}" for k in params)
+    hot = conn.execute(text(
+        "SELECT id, request_op_id, at, department, from_status, to_status, comment FROM history "
+        f"WHERE request_op_id IN ({in_list}) ORDER BY request_op_id, at, id"
+    ), params).all()
+    existing = dict(conn.execute(text(
+        f"SELECT request_op_id || '|' || month, entries FROM archive.history_archive WHERE request_op_id IN ({in_list})"
+    ), params).all())
+
+    segments: Dict[tuple, List[list]] = {}
+    for hid, op_id, at, department, from_status, to_status, comment in hot:
+        segments.setdefault((op_id, targets[op_id]), []).append([hid, at, department, from_status, to_status, comment])
+    rows = []
+    for (op_id, month), entries in segments.items():
+        # a request archived before and changed since: merge into its segment
+        previous = json.loads(existing.get(f"{op_id}|{month}", "[]"))
+        known = {e[0] for e in entries}
+        merged = sorted([e for e in previous if e[0] not in known] + entries, key=lambda e: (e[1], e[0]))
+        rows.append({"op_id": op_id, "month": month, "entries": json.dumps(merged, ensure_ascii=False, separators=(",", ":"))})
+    conn.execute(text(
+        "INSERT INTO archive.history_archive (request_op_id, month, entries) VALUES (:op_id, :month, :entries) "
+        "ON CONFLICT (request_op_id, month) DO UPDATE SET entries = excluded.entries"
+    ), rows)
+    conn.execute(text(f"DELETE FROM history WHERE request_op_id IN ({in_list})"), params)
+    return len(hot)
+
+def archive_history(engine: Engine, keep_months: int = DEFAULT_KEEP_MONTHS, batch: int = ARCHIVE_BATCH) -> int:
+    """Move the history of requests executed before the cutoff month to the archive; returns entries moved.
+
+    Each batch is its own transaction. Across attached files in WAL mode a crash
+    may leave a batch in both places; readers de-duplicate by history id and the
+    next run finishes the move.
+    """
+    cutoff = month_start(keep_months)
+    moved = 0
+    while True:
+        with engine.begin() as conn:
+            n = _archive_batch(conn, cutoff, batch)
+        if not n:
+            return moved
+        moved += n
+
+def main(argv: List[str]) -> int:
+    from .db import engine
+
+    ap = argparse.ArgumentParser(prog="python -m app.archive", description="Move old history of executed requests to the archive DB.")
+    ap.add_argument("--keep-months", type=int, default=DEFAULT_KEEP_MONTHS, help="months of history kept hot after execution")
+    ap.add_argument("--batch", type=int, default=ARCHIVE_BATCH, help="requests moved per transaction")
+    args = ap.parse_args(argv)
+    moved = archive_history(engine, args.keep_months, args.batch)
+    print(f"archived {moved} history entries executed before {month_start(args.keep_months)}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -1,77 +1,80 @@
 from __future__ import annotations
-import os, json, re
+import os, json, re, time
 from typing import Any, Dict, List, Optional, Tuple
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from dotenv import load_dotenv
 
 from .constants import Status
-from .repo import list_requests
+from .assistant_data import Snapshot, get_snapshot, find_operation, planned_between, SNAPSHOT_TTL_S
+from .cache import TTLCache
+from .metrics import LLM_DURATION, LLM_TOKENS
+from .intent import mentions_week, normalize, parse as parse_local
+from .repo import data_version, existing_op_ids
+from .utils import iso_week
 
 load_dotenv()
 
-def _extract_op_id(question: str) -> Optional[str]:
-    m = re.search(r"(OP-\d{4}-\d{4})", question.upper())
-    return m.group(1) if m else None
-
-def _build_context(db: Session) -> Dict[str, Any]:
-    # keep context small: latest 200 ops is enough for demo
-    ops = list_requests(db, status="ALL", q=None)[:200]
-    compact = []
-    for r in ops:
-        compact.append({
-            "op_id": r.op_id,
-            "feature": r.feature,
-            "parameter": r.parameter,
-            "value": r.value,
-            "zone": r.zone,
-            "sites": r.sites,
-            "desired_date": r.desired_date,
-            "planned_date": r.planned_date,
-            "priority": r.priority,
-            "status": r.status,
-            "updated_at": r.updated_at,
-        })
-    return {"operations": compact}
-
-def _safe_answer(question: str, ctx: Dict[str, Any]) -> Tuple[str, List[str]]:
-    ops = ctx.get("operations", [])
-    if not ops:
-        return ("Information non disponible dans la base.", [])
+INTENTS = {"GET_STATUS", "LIST_PLANNED", "LIST_EXECUTED", "LIST_FAILED", "HELP"}
+# below this local-parser confidence the question goes to the LLM (when a key is set)
+LOCAL_CONFIDENCE_THRESHOLD = float(os.getenv("ASSISTANT_LOCAL_CONFIDENCE", "0.7"))
+
+# Answers depend on the data: keys carry data_version(), so any write here makes
+# older entries unreachable, and the TTL (same as the snapshot's) bounds staleness
+# from other workers' writes. LLM parses only depend on the wording of the question.
+CACHE_SIZE = int(os.getenv("ASSISTANT_CACHE_SIZE", "1024"))
+_question_cache: TTLCache[Tuple[str, List[str]]] = TTLCache(CACHE_SIZE, SNAPSHOT_TTL_S)
+_answer_cache: TTLCache[Tuple[str, List[str]]] = TTLCache(CACHE_SIZE, SNAPSHOT_TTL_S)
+_llm_parse_cache: TTLCache[Dict[str, Any]] = TTLCache(CACHE_SIZE, float(os.getenv("ASSISTANT_LLM_CACHE_TTL_S", "86400")))
+
+def cache_stats() -> Dict[str, Any]:
+    return {"question": _question_cache.stats(), "answer": _answer_cache.stats(), "llm_parse": _llm_parse_cache.stats()}
 
-    q = question.lower()
-    op_id = _extract_op_id(question)
+def _build_context(db: Session) -> Snapshot:
+    return get_snapshot(db)
 
-    # 4 supported intents
-    if op_id:
-        for o in ops:
-            if o["op_id"] == op_id:
-                return (f"Statut de {op_id}: {o['status']} (priority: {o['priority']}, feature: {o['feature']}).", [op_id])
+def _local_intent(db: Session, question: str) -> Dict[str, Any]:
+    local = parse_local(question, lambda ids: existing_op_ids(db, ids))
+    return {"normalized_question": question, "intent": local.intent, "op_id": local.op_id, "confidence": local.confidence}
+
+def _answer_intent(intent: str, op_id: Optional[str], op: Optional[Dict[str, Any]], snap: Snapshot) -> Tuple[str, List[str]]:
+    """Strictly DB-based answer for a parsed intent; `op` is the looked-up operation for GET_STATUS."""
+    if not snap.total:
         return ("Information non disponible dans la base.", [])
 
-    if "échec" in q or "en echec" in q or "failed" in q:
-        failed = [o for o in ops if o.get("status") == Status.FAILED.value]
-        refs = [o["op_id"] for o in failed[:12]]
+    if intent == "GET_STATUS" and op_id:
+        if op is None:
+            return ("Information non disponible dans la base.", [])
+        return (f"Statut de {op_id}: {op['status']} (priority: {op['priority']}, feature: {op['feature']}).", [op_id])
+
+    if intent == "LIST_FAILED":
+        refs = [o["op_id"] for o in snap.by_status[Status.FAILED.value]]
         if not refs:
             return ("Non. Aucune opération en échec dans la base.", [])
-        return (f"Oui. {len(failed)} opération(s) en échec. Voir: {', '.join(refs)}.", refs)
+        return (f"Oui. {snap.counts.get(Status.FAILED.value, 0)} opération(s) en échec. Voir: {', '.join(refs)}.", refs)
 
-    if "exécut" in q or "execut" in q or "done" in q:
-        done = [o for o in ops if o.get("status") == Status.EXECUTED.value]
-        refs = [o["op_id"] for o in done[:12]]
+    if intent == "LIST_EXECUTED":
+        refs = [o["op_id"] for o in snap.by_status[Status.EXECUTED.value]]
         if not refs:
             return ("Aucune opération exécutée dans la base.", [])
-        return (f"Opérations exécutées: {', '.join(refs)}.", refs)
+        return (f"{snap.counts.get(Status.EXECUTED.value, 0)} opération(s) exécutée(s). Voir: {', '.join(refs)}.", refs)
 
-    if "plan" in q or "planning" in q or "cette semaine" in q or "prévu" in q:
-        planned = [o for o in ops if o.get("status") == Status.PLANNED.value]
-        refs = [o["op_id"] for o in planned[:12]]
+    if intent == "LIST_PLANNED":
+        refs = [o["op_id"] for o in snap.by_status[Status.PLANNED.value]]
         if not refs:
             return ("Aucune opération planifiée dans la base.", [])
-        return (f"Opérations planifiées: {', '.join(refs)}.", refs)
+        return (f"{snap.counts.get(Status.PLANNED.value, 0)} opération(s) planifiée(s). Voir: {', '.join(refs)}.", refs)
 
     return ("Je peux répondre sur: planifiées / exécutées / en échec / statut d'une opération (OP-YYYY-NNNN).", [])
 
-def _llm_parse_intent(client, question: str, ctx: Dict[str, Any]) -> Dict[str, Any]:
+def _answer_week(week: Tuple[str, str], count: int, rows: List[Dict[str, Any]]) -> Tuple[str, List[str]]:
+    period = f"cette semaine (du {week[0]} au {week[1]})"
+    if not count:
+        return (f"Aucune opération planifiée {period}.", [])
+    refs = [o["op_id"] for o in rows]
+    return (f"{count} opération(s) planifiée(s) {period}. Voir: {', '.join(refs)}.", refs)
+
+async def _llm_parse_intent(client, question: str, known_ids: List[str]) -> Dict[str, Any]:
     """
     Return a strict JSON like:
     {
@@ -81,9 +84,6 @@ def _llm_parse_intent(client, question: str, ctx: Dict[str, Any]) -> Dict[str, A
     }
     Must not invent op_id; if unsure, op_id = null.
     """
-    ops = ctx.get("operations", [])
-    known_ids = [o["op_id"] for o in ops[:200]]
-
     system = (
         "You are a parser for a network operations demo. "
         "Your job is to interpret a potentially misspelled French question and output ONLY a JSON object. "
@@ -109,15 +109,25 @@ def _llm_parse_intent(client, question: str, ctx: Dict[str, Any]) -> Dict[str, A
         }
     }
 
-    resp = client.responses.create(
-        model=os.getenv("OPENAI_MODEL", "gpt-4.1-mini"),
-        input=[
-            {"role": "system", "content": system},
-            {"role": "user", "content": json.dumps(user, ensure_ascii=False)},
-        ],
-        temperature=0.0,
-        max_output_tokens=200,
-    )
+    start = time.perf_counter()
+    try:
+        resp = await client.responses.create(
+            model=os.getenv("OPENAI_MODEL", "gpt-4.1-mini"),
+            input=[
+                {"role": "system", "content": system},
+                {"role": "user", "content": json.dumps(user, ensure_ascii=False)},
+            ],
+            temperature=0.0,
+            max_output_tokens=200,
+        )
+    except Exception:
+        LLM_DURATION.observe(time.perf_counter() - start, "parse_intent", "error")
+        raise
+    LLM_DURATION.observe(time.perf_counter() - start, "parse_intent", "ok")
+    usage = getattr(resp, "usage", None)
+    if usage is not None:
+        LLM_TOKENS.inc("parse_intent", "input", amount=usage.input_tokens or 0)
+        LLM_TOKENS.inc("parse_intent", "output", amount=usage.output_tokens or 0)
 
     text = (resp.output_text or "").strip()
     try:
@@ -128,13 +138,13 @@ def _llm_parse_intent(client, question: str, ctx: Dict[str, Any]) -> Dict[str, A
 
     # normalize & guard
     intent = str(parsed.get("intent", "HELP")).upper()
-    if intent not in {"GET_STATUS", "LIST_PLANNED", "LIST_EXECUTED", "LIST_FAILED", "HELP"}:
+    if intent not in INTENTS:
         intent = "HELP"
 
     op_id = parsed.get("op_id", None)
     if op_id is not None:
         op_id = str(op_id).upper()
-        if not re.match(r"^OP-\d{4}-\d{4}$", op_id):
+        if not re.match(r"^OP-\d{4}-\d{4,}$", op_id):
             op_id = None
 
     return {
@@ -159,58 +169,56 @@ def _parse_llm(text: str) -> Tuple[str, List[str]]:
     m_refs = re.search(r"Références\s*:\s*(\[.*?\])", text, re.IGNORECASE | re.DOTALL)
     if m_refs:
         raw = m_refs.group(1)
-        refs = re.findall(r"OP-\d{4}-\d{4}", raw.upper())
+        refs = re.findall(r"OP-\d{4}-\d{4,}", raw.upper())
 
     return answer, refs
 
-def answer(db: Session, question: str) -> Tuple[str, List[str]]:
-    ctx = _build_context(db)
-
-    api_key = os.getenv("OPENAI_API_KEY", "").strip()
-    if not api_key:
-        return _safe_answer(question, ctx)
-
-    from openai import OpenAI
-    client = OpenAI(api_key=api_key)
-
-    parsed = _llm_parse_intent(client, question, ctx)
-
-    ops = ctx.get("operations", [])
-    if not ops:
-        return ("Information non disponible dans la base.", [])
+_client = None
+
+def _get_client(api_key: str):
+    # one AsyncOpenAI client per process so its HTTP connection pool is reused
+    global _client
+    if _client is None or _client.api_key != api_key:
+        from openai import AsyncOpenAI
+        _client = AsyncOpenAI(api_key=api_key)
+    return _client
+
+async def _cached_llm_parse(question: str, key: str, known_ids: List[str]) -> Dict[str, Any]:
+    parsed = _llm_parse_cache.get(key)
+    if parsed is None:
+        parsed = await _llm_parse_intent(_get_client(os.environ["OPENAI_API_KEY"].strip()), question, known_ids)
+        _llm_parse_cache.set(key, parsed)
+    return parsed
+
+async def answer(db: AsyncSession, question: str) -> Tuple[str, List[str]]:
+    key = normalize(question)
+    version = data_version()
+    cached = _question_cache.get((key, version))
+    if cached is not None:
+        return cached
+
+    snap = await db.run_sync(_build_context)
+    parsed = await db.run_sync(_local_intent, question)
+    if os.getenv("OPENAI_API_KEY", "").strip() and parsed["confidence"] < LOCAL_CONFIDENCE_THRESHOLD:
+        # end the read transaction so the pooled connection is not held during the LLM call;
+        # the lookups below check a connection out again only for their own queries
+        await db.commit()
+        parsed = await _cached_llm_parse(question, key, snap.recent_op_ids)
 
     intent = parsed["intent"]
     op_id = parsed["op_id"]
-
-    # === Strictly DB-based answers ===
-    if intent == "GET_STATUS" and op_id:
-        for o in ops:
-            if o["op_id"] == op_id:
-                return (
-                    f"Statut de {op_id}: {o['status']} (priority: {o['priority']}, feature: {o['feature']}).",
-                    [op_id],
-                )
-        return ("Information non disponible dans la base.", [])
-
-    if intent == "LIST_FAILED":
-        failed = [o for o in ops if o.get("status") == Status.FAILED.value]
-        refs = [o["op_id"] for o in failed[:12]]
-        if not refs:
-            return ("Non. Aucune opération en échec dans la base.", [])
-        return (f"Oui. {len(failed)} opération(s) en échec. Voir: {', '.join(refs)}.", refs)
-
-    if intent == "LIST_EXECUTED":
-        done = [o for o in ops if o.get("status") == Status.EXECUTED.value]
-        refs = [o["op_id"] for o in done[:12]]
-        if not refs:
-            return ("Aucune opération exécutée dans la base.", [])
-        return (f"Opérations exécutées: {', '.join(refs)}.", refs)
-
-    if intent == "LIST_PLANNED":
-        planned = [o for o in ops if o.get("status") == Status.PLANNED.value]
-        refs = [o["op_id"] for o in planned[:12]]
-        if not refs:
-            return ("Aucune opération planifiée dans la base.", [])
-        return (f"Opérations planifiées: {', '.join(refs)}.", refs)
-
-    return ("Je peux répondre sur: planifiées / exécutées / en échec / statut d'une opération (OP-YYYY-NNNN).", [])
+    # "cette semaine": planned_date range query over the current ISO week
+    week = iso_week() if intent == "LIST_PLANNED" and mentions_week(question) else None
+    result = _answer_cache.get((intent, op_id, week, snap.version))
+    if result is None:
+        if week is not None:
+            result = _answer_week(week, *await db.run_sync(planned_between, *week))
+        else:
+            op = None
+            if intent == "GET_STATUS" and op_id:
+                op = await db.run_sync(find_operation, snap, op_id)
+            result = _answer_intent(intent, op_id, op, snap)
+        _answer_cache.set((intent, op_id, week, snap.version), result)
+    if snap.version == version:
+        _question_cache.set((key, version), result)
+    return result
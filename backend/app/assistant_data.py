@@ -0,0 +1,113 @@
+from __future__ import annotations
+import os
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import select, func
+from sqlalchemy.orm import Session
+
+from .constants import Status
+from .metrics import add_rows
+from .models import Request
+from .repo import data_version, planning_stmts
+
+# operations listed per intent in an answer
+LIST_LIMIT = 12
+# latest op_ids handed to the LLM parser for typo correction
+RECENT_OP_IDS = 200
+# other worker processes' writes do not bump our data_version: rebuild at least this often
+SNAPSHOT_TTL_S = float(os.getenv("ASSISTANT_SNAPSHOT_TTL_S", "30"))
+
+_COMPACT_COLUMNS = (
+    Request.op_id,
+    Request.feature,
+    Request.parameter,
+    Request.value,
+    Request.zone,
+    Request.desired_date,
+    Request.planned_date,
+    Request.priority,
+    Request.status,
+    Request.updated_at,
+)
+
+@dataclass
+class Snapshot:
+    """What the assistant answers from: true per-status counts over the whole
+    table, the first LIST_LIMIT operations of each status, and an op_id index."""
+    version: int
+    built_at: float
+    counts: Dict[str, int]
+    by_status: Dict[str, List[Dict[str, Any]]]
+    by_op_id: Dict[str, Dict[str, Any]]
+    recent_op_ids: List[str]
+
+    @property
+    def total(self) -> int:
+        return sum(self.counts.values())
+
+def _compact(stmt) -> Any:
+    return stmt.with_only_columns(*_COMPACT_COLUMNS)
+
+def build_snapshot(db: Session) -> Snapshot:
+    version = data_version()
+    counts = {status: n for status, n in db.execute(select(Request.status, func.count()).group_by(Request.status))}
+    by_status: Dict[str, List[Dict[str, Any]]] = {}
+    for status in Status:
+        if status == Status.PLANNED:
+            # same order as the planning view: dated first, then undated
+            rows: List[Dict[str, Any]] = []
+            for stmt in planning_stmts():
+                rows += [dict(m) for m in db.execute(_compact(stmt).limit(LIST_LIMIT - len(rows))).mappings()]
+                if len(rows) >= LIST_LIMIT:
+                    break
+        else:
+            stmt = (
+                select(*_COMPACT_COLUMNS)
+                .where(Request.status == status.value)
+                .order_by(Request.updated_at.desc(), Request.id.desc())
+                .limit(LIST_LIMIT)
+            )
+            rows = [dict(m) for m in db.execute(stmt).mappings()]
+        by_status[status.value] = rows
+    recent = list(db.execute(
+        select(Request.op_id).order_by(Request.updated_at.desc(), Request.id.desc()).limit(RECENT_OP_IDS)
+    ).scalars())
+    add_rows(len(counts) + sum(len(rows) for rows in by_status.values()) + len(recent))
+    return Snapshot(
+        version=version,
+        built_at=time.monotonic(),
+        counts=counts,
+        by_status=by_status,
+        by_op_id={o["op_id"]: o for rows in by_status.values() for o in rows},
+        recent_op_ids=recent,
+    )
+
+_snapshot: Optional[Snapshot] = None
+
+def get_snapshot(db: Session) -> Snapshot:
+    """Current snapshot, rebuilt only after a write (data_version) or when the TTL expires."""
+    global _snapshot
+    snap = _snapshot
+    if snap is None or snap.version != data_version() or time.monotonic() - snap.built_at > SNAPSHOT_TTL_S:
+        snap = _snapshot = build_snapshot(db)
+    return snap
+
+def find_operation(db: Session, snap: Snapshot, op_id: str) -> Optional[Dict[str, Any]]:
+    """O(1) from the snapshot index; otherwise one indexed lookup, remembered in the snapshot."""
+    op = snap.by_op_id.get(op_id)
+    if op is None:
+        row = db.execute(select(*_COMPACT_COLUMNS).where(Request.op_id == op_id)).mappings().first()
+        add_rows(0 if row is None else 1)
+        if row is not None:
+            op = snap.by_op_id[op_id] = dict(row)
+    return op
+
+def planned_between(db: Session, date_from: str, date_to: str) -> Tuple[int, List[Dict[str, Any]]]:
+    """PLANNED operations dated within [date_from, date_to]: the count and the first LIST_LIMIT,
+    both range scans of ix_requests_status_planned_date."""
+    (stmt,) = planning_stmts(date_from, date_to)
+    count = db.execute(stmt.with_only_columns(func.count()).order_by(None)).scalar_one()
+    rows = [dict(m) for m in db.execute(_compact(stmt).limit(LIST_LIMIT)).mappings()]
+    add_rows(1 + len(rows))
+    return count, rows
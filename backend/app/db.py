@@ -1,18 +1,158 @@
+import asyncio
+import contextvars
 import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, TypeVar
 from dotenv import load_dotenv
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.engine import Engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+
+from .metrics import instrument_engine
 
 load_dotenv()
 
+T = TypeVar("T")
+
+# PRAGMAs applied on every new SQLite connection, per DB_PROFILE.
+# "production": WAL lets readers run while a write is in progress, NORMAL sync is
+# durable in WAL mode, busy_timeout waits for locks instead of failing with
+# "database is locked", and mmap/cache keep the hot pages in memory.
+SQLITE_PROFILES: Dict[str, Dict[str, Any]] = {
+    "default": {},
+    "production": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "busy_timeout": 5000,
+        "mmap_size": 256 * 1024 * 1024,
+        "cache_size": -64000,  # KiB
+        "temp_store": "MEMORY",
+    },
+}
+
 def get_db_path() -> str:
     return os.getenv("DB_PATH", "data/app.db")
 
-def get_engine() -> Engine:
-    db_path = get_db_path()
-    os.makedirs(os.path.dirname(db_path), exist_ok=True)
-    return create_engine(f"sqlite:///{db_path}", future=True, connect_args={"check_same_thread": False})
+def get_db_profile() -> str:
+    return os.getenv("DB_PROFILE", "production")
+
+def get_database_url() -> str:
+    # DATABASE_URL (e.g. sqlite:////var/lib/app/app.db) overrides DB_PATH. SQLite only:
+    # full-text search (FTS5), triggers, the archive ATTACH and the migrations depend on it
+    url = os.getenv("DATABASE_URL") or f"sqlite:///{get_db_path()}"
+    if not url.startswith("sqlite"):
+        raise ValueError(f"Unsupported DATABASE_URL {url.split('://', 1)[0]}://...: only SQLite is supported")
+    return url
+
+def get_archive_path(url: str) -> Optional[str]:
+    """File attached as schema "archive" (app.archive): ARCHIVE_DB_PATH, else next to the main database."""
+    if os.getenv("ARCHIVE_DB_PATH"):
+        return os.getenv("ARCHIVE_DB_PATH")
+    if not url.startswith("sqlite") or "///" not in url or ":memory:" in url:
+        return None
+    root, _ = os.path.splitext(url.split("///", 1)[1])
+    return root + ".archive.db"
+
+def get_async_database_url() -> str:
+    url = get_database_url()
+    if url.startswith("sqlite://"):
+        return "sqlite+aiosqlite://" + url[len("sqlite://"):]
+    return url
+
+def _pool_args() -> Dict[str, int]:
+    # one connection per concurrent handler; WEB_CONCURRENCY workers each get their own pool
+    return {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "10")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "10")),
+    }
+
+def _ensure_db_dir(url: str) -> None:
+    if url.startswith("sqlite") and "///" in url:
+        os.makedirs(os.path.dirname(url.split("///", 1)[1]) or ".", exist_ok=True)
+
+def apply_sqlite_profile(engine: Engine, profile: Optional[str] = None) -> None:
+    pragmas = SQLITE_PROFILES[profile or get_db_profile()]
+    if engine.dialect.name != "sqlite" or not pragmas:
+        return
+
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+def attach_archive(engine: Engine, path: Optional[str]) -> None:
+    if engine.dialect.name != "sqlite" or not path:
+        return
+    from .archive import install_archive
+
+    @event.listens_for(engine, "connect")
+    def _attach(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("ATTACH DATABASE ? AS archive", (path,))
+        cursor.close()
+        install_archive(dbapi_connection)
+
+def get_engine(url: Optional[str] = None, profile: Optional[str] = None) -> Engine:
+    url = url or get_database_url()
+    _ensure_db_dir(url)
+    connect_args = {"check_same_thread": False} if url.startswith("sqlite") else {}
+    engine = create_engine(url, future=True, connect_args=connect_args, poolclass=QueuePool, **_pool_args())
+    apply_sqlite_profile(engine, profile)
+    attach_archive(engine, get_archive_path(url))
+    instrument_engine(engine)
+    return engine
+
+def get_async_engine(url: Optional[str] = None, profile: Optional[str] = None) -> AsyncEngine:
+    url = url or get_async_database_url()
+    _ensure_db_dir(url)
+    engine = create_async_engine(url, poolclass=AsyncAdaptedQueuePool, **_pool_args())
+    apply_sqlite_profile(engine.sync_engine, profile)
+    attach_archive(engine.sync_engine, get_archive_path(url))
+    instrument_engine(engine.sync_engine)
+    return engine
 
 engine = get_engine()
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
+
+# async path used by the API handlers; the sync engine stays for migrations,
+# scripts and the single writer below
+async_engine = get_async_engine()
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+# All mutations run on one thread with their own session: SQLite allows a single
+# writer anyway, and queueing in-process avoids lock contention (and the
+# SQLITE_BUSY a reader hits when upgrading to a write transaction in WAL mode).
+def _new_writer() -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-writer")
+
+_writer = _new_writer()
+
+def _call_with_session(fn: Callable[..., T], args: tuple) -> T:
+    with SessionLocal() as db:
+        return fn(db, *args)
+
+def _submit(fn: Callable[..., T], args: tuple):
+    # the caller's context (e.g. metrics.current_request) follows the write onto the writer thread
+    return _writer.submit(contextvars.copy_context().run, _call_with_session, fn, args)
+
+async def run_write_async(fn: Callable[..., T], *args: Any) -> T:
+    """Run fn(session, *args) on the writer thread; the event loop keeps serving while the write is queued."""
+    return await asyncio.wrap_future(_submit(fn, args))
+
+async def shutdown() -> None:
+    """Finish queued writes, stop the writer thread and close every pooled connection.
+
+    aiosqlite runs each connection on a non-daemon thread, so the process cannot
+    exit while the async pool holds any. Called from the app's lifespan; the
+    writer is replaced (its thread starts on first use) so the app can start again
+    in the same process, as tests do.
+    """
+    global _writer
+    writer, _writer = _writer, _new_writer()
+    await asyncio.to_thread(writer.shutdown)
+    await async_engine.dispose()
+    engine.dispose()
@@ -0,0 +1,134 @@
+from __future__ import annotations
+import asyncio
+import json
+import os
+import threading
+from collections import deque
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, Iterable, List, Optional
+
+# Change feed behind GET /events. Every committed create or status change has a
+# history row, so an event is that row plus the request's new state, and the
+# history id doubles as the SSE event id that clients resume from.
+EVENT_BUFFER_SIZE = int(os.getenv("EVENT_BUFFER_SIZE", "10000"))
+# comment line sent to idle subscribers so proxies keep the connection open
+HEARTBEAT_S = float(os.getenv("EVENT_HEARTBEAT_S", "15"))
+
+def history_event(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Compact delta for one history row (dict with id, request_op_id, at, department, from/to_status, comment)."""
+    return {
+        "id": row["id"],
+        "type": "created" if row["from_status"] is None else "status",
+        "op_id": row["request_op_id"],
+        "status": row["to_status"],
+        "updated_at": row["at"],
+        "history": {
+            "at": row["at"],
+            "department": row["department"],
+            "from_status": row["from_status"],
+            "to_status": row["to_status"],
+            "comment": row["comment"],
+        },
+    }
+
+def format_sse(event: Dict[str, Any]) -> bytes:
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n".encode()
+
+class EventBus:
+    """In-process fan-out: a ring buffer of recent events plus one shared wake-up future.
+
+    Publishers may run on any thread (the db writer). Subscribers are coroutines that
+    remember the last id they sent; an idle subscriber costs one pending await on the
+    shared future, and a publish wakes all of them with a single set_result.
+    """
+
+    def __init__(self, size: int = EVENT_BUFFER_SIZE):
+        self._events: Deque[Dict[str, Any]] = deque(maxlen=size)
+        self._lock = threading.Lock()
+        # highest id that fell out of the buffer: subscribers behind it read from the db
+        self._evicted_upto = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._waiter: Optional[asyncio.Future] = None
+
+    @property
+    def last_id(self) -> int:
+        with self._lock:
+            return self._events[-1]["id"] if self._events else self._evicted_upto
+
+    def publish(self, events: Iterable[Dict[str, Any]]) -> None:
+        events = list(events)
+        if not events:
+            return
+        with self._lock:
+            for e in events:
+                if len(self._events) == self._events.maxlen:
+                    self._evicted_upto = self._events[0]["id"]
+                self._events.append(e)
+            loop = self._loop
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(self._wake)
+
+    def _wake(self) -> None:
+        waiter, self._waiter = self._waiter, None
+        if waiter is not None and not waiter.done():
+            waiter.set_result(None)
+
+    def since(self, after: int) -> Optional[List[Dict[str, Any]]]:
+        """Buffered events with id > after, or None when some of them were already evicted."""
+        with self._lock:
+            if after < self._evicted_upto:
+                return None
+            if not self._events or self._events[-1]["id"] <= after:
+                return []
+            return [e for e in self._events if e["id"] > after]
+
+    async def wait(self, after: int, timeout: float) -> Optional[List[Dict[str, Any]]]:
+        """Events after `after`, waiting up to `timeout` seconds for the next publish."""
+        events = self.since(after)
+        if events is None or events:
+            return events
+        self._loop = asyncio.get_running_loop()
+        if self._waiter is None or self._waiter.done():
+            self._waiter = self._loop.create_future()
+        try:
+            await asyncio.wait_for(asyncio.shield(self._waiter), timeout)
+        except asyncio.TimeoutError:
+            return []
+        return self.since(after)
+
+bus = EventBus()
+
+def publish(events: Iterable[Dict[str, Any]]) -> None:
+    bus.publish(events)
+
+async def stream(
+    after: Optional[int],
+    load_since: Callable[[int, int], Awaitable[List[Dict[str, Any]]]],
+    page_size: int = 500,
+) -> AsyncIterator[bytes]:
+    """SSE byte stream of events after `after` (None: only new ones).
+
+    Resuming clients, and subscribers that fell behind the ring buffer, are
+    caught up from the history table through `load_since(after_id, limit)`.
+    """
+    yield b"retry: 3000\n\n"
+    if after is None:
+        after = bus.last_id
+    else:
+        while True:
+            events = await load_since(after, page_size)
+            for e in events:
+                yield format_sse(e)
+            if events:
+                after = events[-1]["id"]
+            if len(events) < page_size:
+                break
+    while True:
+        events = await bus.wait(after, HEARTBEAT_S)
+        if events is None:
+            events = await load_since(after, page_size)
+        if not events:
+            yield b": ping\n\n"
+            continue
+        for e in events:
+            yield format_sse(e)
+        after = events[-1]["id"]
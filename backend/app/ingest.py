@@ -0,0 +1,103 @@
+from __future__ import annotations
+import csv
+import json
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from pydantic import ValidationError
+from starlette.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+from .db import run_write_async
+from .repo import bulk_create_requests
+from .schemas import RequestCreate
+
+# rows written per transaction by POST /requests/bulk
+BULK_CHUNK_SIZE = 500
+
+class DuplexStreamingResponse(StreamingResponse):
+    """StreamingResponse whose body is produced while the request body is still being read.
+
+    The stock response listens for http.disconnect on `receive` concurrently, which
+    would swallow the request body messages the body iterator is consuming.
+    """
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+async def _iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, str]]:
+    buf = b""
+    line_no = 0
+    async for chunk in chunks:
+        buf += chunk
+        *lines, buf = buf.split(b"\n")
+        for raw in lines:
+            line_no += 1
+            yield line_no, raw.decode("utf-8-sig" if line_no == 1 else "utf-8").rstrip("\r")
+    if buf:
+        yield line_no + 1, buf.decode("utf-8-sig" if line_no == 0 else "utf-8").rstrip("\r")
+
+async def iter_records(chunks: AsyncIterator[bytes], fmt: str) -> AsyncIterator[Tuple[int, Any]]:
+    """Yield (line number, dict or error message) from an NDJSON or CSV byte stream.
+
+    CSV input needs a header line; a quoted field may not span lines.
+    """
+    header: Optional[List[str]] = None
+    async for line_no, line in _iter_lines(chunks):
+        if not line.strip():
+            continue
+        if fmt == "csv":
+            values = next(csv.reader([line]))
+            if header is None:
+                header = [h.strip() for h in values]
+                continue
+            if len(values) != len(header):
+                yield line_no, f"expected {len(header)} columns, got {len(values)}"
+                continue
+            yield line_no, {k: (v if v != "" else None) for k, v in zip(header, values)}
+        else:
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                yield line_no, f"invalid JSON: {e}"
+                continue
+            if not isinstance(record, dict):
+                yield line_no, "expected a JSON object"
+                continue
+            yield line_no, record
+
+def _format_errors(e: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(p) for p in err['loc']) or 'row'}: {err['msg']}" for err in e.errors())
+
+async def ingest(chunks: AsyncIterator[bytes], fmt: str) -> AsyncIterator[bytes]:
+    """Validate rows as they arrive, write them in chunked transactions and stream back one result per row."""
+    pending: List[Tuple[int, Dict[str, Any]]] = []
+
+    async def flush() -> AsyncIterator[bytes]:
+        lines = [n for n, _ in pending]
+        try:
+            op_ids = await run_write_async(bulk_create_requests, [p for _, p in pending])
+            results = [{"line": n, "op_id": op_id} for n, op_id in zip(lines, op_ids)]
+        except Exception as e:
+            results = [{"line": n, "error": f"write failed: {e.__class__.__name__}"} for n in lines]
+        pending.clear()
+        for r in results:
+            yield (json.dumps(r) + "\n").encode()
+
+    async for line_no, record in iter_records(chunks, fmt):
+        if isinstance(record, str):
+            yield (json.dumps({"line": line_no, "error": record}, ensure_ascii=False) + "\n").encode()
+            continue
+        try:
+            body = RequestCreate.model_validate(record)
+        except ValidationError as e:
+            yield (json.dumps({"line": line_no, "error": _format_errors(e)}, ensure_ascii=False) + "\n").encode()
+            continue
+        pending.append((line_no, body.model_dump()))
+        if len(pending) >= BULK_CHUNK_SIZE:
+            async for out in flush():
+                yield out
+    if pending:
+        async for out in flush():
+            yield out
@@ -0,0 +1,114 @@
+from __future__ import annotations
+import re
+import unicodedata
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Set
+
+# Deterministic parser for the assistant: keyword stems for the French intents
+# and an op_id matcher that repairs common typos (O/0, I/1, a wrong or missing
+# digit). The LLM parser is only needed when this one is not confident.
+
+class LocalParse(NamedTuple):
+    intent: str
+    op_id: Optional[str]
+    confidence: float
+
+# stems are matched against the start of accent-stripped, lower-cased words
+INTENT_STEMS: Dict[str, List[str]] = {
+    "LIST_FAILED": ["echec", "echou", "fail", "erreur", "errone", "ko", "rate"],
+    "LIST_EXECUTED": ["execut", "fait", "termin", "done", "realis", "fini", "effectu", "deploy"],
+    "LIST_PLANNED": ["planif", "plann", "prevu", "prevoi", "programm", "semaine", "venir", "calendrier"],
+    "GET_STATUS": ["statut", "status", "etat", "avancement"],
+}
+
+# narrows LIST_PLANNED to the current ISO week
+WEEK_STEMS = ["semaine", "week", "hebdo"]
+
+# characters commonly typed instead of digits in an op_id
+_DIGIT_LOOKALIKES = str.maketrans({"O": "0", "Q": "0", "D": "0", "I": "1", "L": "1", "Z": "2", "S": "5", "B": "8"})
+_OP_ID_CANDIDATE = re.compile(r"\b[O0Q]P[\s_.-]*([0-9OQDILZSB]{4})[\s_.-]*([0-9OQDILZSB]{1,8})\b")
+
+def normalize(text: str) -> str:
+    stripped = unicodedata.normalize("NFKD", text)
+    stripped = "".join(c for c in stripped if not unicodedata.combining(c))
+    return re.sub(r"\s+", " ", stripped.lower()).strip()
+
+def _close(word: str, stem: str) -> bool:
+    """word starts with stem, allowing one substitution/deletion/transposition for stems of 5+ letters."""
+    if word.startswith(stem):
+        return True
+    if len(stem) < 5 or len(word) < len(stem) - 1:
+        return False
+    head = word[:len(stem)]
+    if sum(a != b for a, b in zip(head, stem)) == 1 and len(head) == len(stem):
+        return True
+    for i in range(len(stem)):
+        if word.startswith(stem[:i] + stem[i + 1:]):
+            return True
+        if i + 1 < len(stem) and word.startswith(stem[:i] + stem[i + 1] + stem[i] + stem[i + 2:]):
+            return True
+    return False
+
+def score_intents(question: str) -> Dict[str, int]:
+    words = re.findall(r"[a-z0-9]+", normalize(question))
+    return {
+        intent: sum(1 for w in words if any(_close(w, s) for s in stems))
+        for intent, stems in INTENT_STEMS.items()
+    }
+
+def mentions_week(question: str) -> bool:
+    return any(_close(w, s) for w in re.findall(r"[a-z0-9]+", normalize(question)) for s in WEEK_STEMS)
+
+def op_id_candidate(question: str) -> Optional[str]:
+    m = _OP_ID_CANDIDATE.search(normalize(question).upper())
+    if not m:
+        return None
+    year = m.group(1).translate(_DIGIT_LOOKALIKES)
+    number = m.group(2).translate(_DIGIT_LOOKALIKES)
+    return f"OP-{year}-{int(number):04d}"
+
+def op_id_neighbors(op_id: str) -> Set[str]:
+    """Every op_id one edit away in the numeric part (substitute, delete, insert, swap)."""
+    prefix, number = op_id.rsplit("-", 1)
+    digits = "0123456789"
+    variants: Set[str] = set()
+    for i in range(len(number) + 1):
+        for d in digits:
+            variants.add(number[:i] + d + number[i:])
+        if i < len(number):
+            variants.add(number[:i] + number[i + 1:])
+            for d in digits:
+                variants.add(number[:i] + d + number[i + 1:])
+        if i + 1 < len(number):
+            variants.add(number[:i] + number[i + 1] + number[i] + number[i + 2:])
+    out = set()
+    for v in variants:
+        if v and v.isdigit() and int(v) > 0:
+            out.add(f"{prefix}-{int(v):04d}")
+    out.discard(op_id)
+    return out
+
+def resolve_op_id(candidate: str, existing: Callable[[Iterable[str]], Set[str]]) -> tuple[Optional[str], float]:
+    """Map a candidate to a known op_id: exact match, else a unique one-edit neighbour."""
+    if candidate in existing([candidate]):
+        return candidate, 1.0
+    hits = existing(sorted(op_id_neighbors(candidate)))
+    if len(hits) == 1:
+        return next(iter(hits)), 0.8
+    # unknown or ambiguous: keep the literal id, let the caller decide
+    return candidate, 0.4
+
+def parse(question: str, existing: Callable[[Iterable[str]], Set[str]]) -> LocalParse:
+    candidate = op_id_candidate(question)
+    if candidate:
+        op_id, confidence = resolve_op_id(candidate, existing)
+        return LocalParse("GET_STATUS", op_id, confidence)
+
+    scores = score_intents(question)
+    scores.pop("GET_STATUS")
+    best = max(scores.values())
+    if best == 0:
+        return LocalParse("HELP", None, 0.3)
+    leaders = [intent for intent, n in scores.items() if n == best]
+    if len(leaders) > 1:
+        return LocalParse(sorted(leaders)[0], None, 0.5)
+    return LocalParse(leaders[0], None, 0.9)
@@ -1,22 +1,49 @@
 from __future__ import annotations
 import os
-from fastapi import FastAPI, Depends, HTTPException, Query
+from contextlib import asynccontextmanager
+from datetime import date
+from fastapi import FastAPI, Depends, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from dotenv import load_dotenv
 
-from .db import SessionLocal, engine
+from .db import AsyncSessionLocal, engine, shutdown as shutdown_db
 from .models import Base
-from .schemas import RequestCreate, RequestOut, HistoryOut, RequestDetailOut, StatusUpdateIn, AssistantIn, AssistantOut
-from .repo import create_request, list_requests, get_request, get_history, update_status, list_planning
-from .constants import Status, Department, ALLOWED_TRANSITIONS
-from .assistant import answer as assistant_answer
+from .migrations import upgrade
+from .schemas import (
+    RequestCreate, RequestOut, HistoryOut, RequestDetailOut, RequestBatchOut, StatusUpdateIn, AssistantIn, AssistantOut,
+    BatchStatusUpdateIn, BatchStatusUpdateOut, BatchStatusResultOut, StatsOut, PlanningConflictsOut, PlanningSuggestOut,
+)
+from .repo_async import (
+    create_request, list_requests_page, count_requests, search_requests, get_request, get_request_detail,
+    get_request_details, get_history,
+    update_status, batch_update_status, list_planning, history_events_since, table_version, request_version,
+    get_stats, planned_operations, pending_operations,
+)
+from .state_machine import TransitionRejected, rule_for
+from .assistant import answer as assistant_answer, cache_stats as assistant_cache_stats
+from .ingest import ingest, DuplexStreamingResponse
+from .events import stream as event_stream
+from .responses import make_etag, etag_matches, not_modified, json_response
+from .utils import days_ago_iso
+from .repo import FILTER_FIELDS, REQUEST_COLUMNS, HISTORY_COLUMNS, export_requests_stmt, export_history_stmts
+from .export import stream_export, MEDIA_TYPES
+from .archive import has_archive
+from .metrics import MetricsMiddleware, render as render_metrics
+from .planning import SITE_WINDOW_DAYS, find_conflicts, suggest_schedule
 
 load_dotenv()
 
 Base.metadata.create_all(bind=engine)
+upgrade(engine)
 
-app = FastAPI(title="Network Ops Demo API", version="1.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    await shutdown_db()
+
+app = FastAPI(title="Network Ops Demo API", version="1.0", lifespan=lifespan)
 
 origins = os.getenv("CORS_ORIGINS", "http://localhost:3000").split(",")
 app.add_middleware(
@@ -25,100 +52,317 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Total-Count", "X-Next-Cursor", "ETag"],
 )
+app.add_middleware(MetricsMiddleware)
 
-def get_db():
-    db = SessionLocal()
-    try:
+def _iso(day: date | None) -> str | None:
+    # date query params are validated by FastAPI (422 on impossible dates); repo filters take ISO strings
+    return day.isoformat() if day else None
+
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
 @app.get("/health")
-def health():
+async def health():
     return {"ok": True}
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus text exposition of this worker's metrics."""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 @app.post("/requests", response_model=RequestOut)
-def api_create_request(body: RequestCreate, db: Session = Depends(get_db)):
-    op_id = create_request(db, body.model_dump())
-    req = get_request(db, op_id)
+async def api_create_request(body: RequestCreate, db: AsyncSession = Depends(get_db)):
+    op_id = await create_request(db, body.model_dump())
+    req = await get_request(db, op_id)
     return _to_request_out(req)
 
+@app.post("/requests/bulk")
+async def api_bulk_create_requests(request: Request, format: str | None = Query(None, pattern="^(ndjson|csv)$")):
+    """Stream NDJSON or CSV rows in; stream one NDJSON result per row out ({line, op_id} or {line, error})."""
+    fmt = format or ("csv" if "csv" in request.headers.get("content-type", "") else "ndjson")
+    return DuplexStreamingResponse(ingest(request.stream(), fmt), media_type="application/x-ndjson")
+
+async def _load_events_since(after_id: int, limit: int):
+    # short-lived session: subscribers must not hold a pooled connection while idle
+    async with AsyncSessionLocal() as db:
+        return await history_events_since(db, after_id, limit)
+
+@app.get("/events")
+async def api_events(request: Request, last_event_id: int | None = Query(None, ge=0)):
+    """Server-Sent Events: one delta per committed create/status change (history id as event id).
+
+    Resume with the Last-Event-ID header (sent by EventSource on reconnect) or ?last_event_id=.
+    Only writes made by this worker process are pushed live; resumes read them all from history.
+    """
+    header = request.headers.get("last-event-id", "")
+    after = int(header) if header.isdigit() else last_event_id
+    return StreamingResponse(
+        event_stream(after, _load_events_since),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 @app.get("/requests", response_model=list[RequestOut])
-def api_list_requests(
+async def api_list_requests(
+    request: Request,
     status: str = Query("ALL"),
     q: str | None = Query(None),
-    db: Session = Depends(get_db)
+    site: str | None = Query(None),
+    limit: int = Query(200, ge=1, le=1000),
+    cursor: str | None = Query(None),
+    date_from: date | None = Query(None, alias="from", description="created on or after (YYYY-MM-DD)"),
+    date_to: date | None = Query(None, alias="to", description="created on or before (YYYY-MM-DD)"),
+    feature: str | None = Query(None),
+    parameter: str | None = Query(None),
+    priority: str | None = Query(None),
+    db: AsyncSession = Depends(get_db)
 ):
-    items = list_requests(db, status=status, q=q)
-    return [_to_request_out(r) for r in items]
+    fields = {k: v for k, v in zip(FILTER_FIELDS, (feature, parameter, priority)) if v}
+    return await _list_page(
+        db, request, status=status, q=q, site=site, limit=limit, cursor=cursor,
+        date_from=_iso(date_from), date_to=_iso(date_to), fields=fields,
+    )
 
+@app.get("/sites/{code}/requests", response_model=list[RequestOut])
+async def api_site_requests(
+    code: str,
+    request: Request,
+    status: str = Query("ALL"),
+    limit: int = Query(200, ge=1, le=1000),
+    cursor: str | None = Query(None),
+    db: AsyncSession = Depends(get_db)
+):
+    return await _list_page(db, request, status=status, q=None, site=code, limit=limit, cursor=cursor)
 
-@app.get("/requests/{op_id}", response_model=RequestDetailOut)
-def api_get_request(op_id: str, db: Session = Depends(get_db)):
-    req = get_request(db, op_id)
-    if not req:
-        raise HTTPException(404, "Not found")
+async def _list_page(
+    db: AsyncSession, request: Request, status: str, q: str | None, site: str | None, limit: int, cursor: str | None,
+    date_from: str | None = None, date_to: str | None = None, fields: dict[str, str] | None = None,
+):
+    etag = make_etag("requests", await table_version(db))
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    try:
+        items, next_cursor = await list_requests_page(
+            db, status=status, q=q, limit=limit, cursor=cursor, site=site, date_from=date_from, date_to=date_to, fields=fields
+        )
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    headers = {}
+    # total only on the first page: later pages keep the count the client already has
+    if cursor is None:
+        headers["X-Total-Count"] = str(await count_requests(
+            db, status=status, q=q, site=site, date_from=date_from, date_to=date_to, fields=fields
+        ))
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+    return json_response(request, items, etag, headers)
 
-    hist = get_history(db, op_id)
+@app.get("/requests:search", response_model=list[RequestOut])
+async def api_search_requests(
+    request: Request,
+    q: str = Query(..., min_length=1),
+    status: str = Query("ALL"),
+    limit: int = Query(50, ge=1, le=500),
+    db: AsyncSession = Depends(get_db)
+):
+    return json_response(request, await search_requests(db, q=q, status=status, limit=limit))
 
-    return {
-        "request": _to_request_out(req),
-        "history": [
-            HistoryOut(
-                at=h.at,
-                department=h.department,
-                from_status=h.from_status,
-                to_status=h.to_status,
-                comment=h.comment,
-            )
-            for h in hist
-        ],
-    }
+# limit for GET /requests:batchGet
+MAX_BATCH_GET = 500
 
+@app.get("/requests:batchGet", response_model=RequestBatchOut)
+async def api_batch_get_requests(
+    request: Request,
+    ids: list[str] = Query(..., description="Repeat ids= or pass a comma-separated list"),
+    db: AsyncSession = Depends(get_db),
+):
+    wanted = list(dict.fromkeys(i.strip() for raw in ids for i in raw.split(",") if i.strip()))
+    if len(wanted) > MAX_BATCH_GET:
+        raise HTTPException(400, f"At most {MAX_BATCH_GET} ids per call")
+    found = {r.op_id: r for r in await get_request_details(db, wanted)}
+    return json_response(request, {
+        "items": [_detail_dict(found[op_id]) for op_id in wanted if op_id in found],
+        "missing": [op_id for op_id in wanted if op_id not in found],
+    })
 
+@app.get("/requests/{op_id}", response_model=RequestDetailOut)
+async def api_get_request(op_id: str, request: Request, db: AsyncSession = Depends(get_db)):
+    version = await request_version(db, op_id)
+    if version is None:
+        raise HTTPException(404, "Not found")
+    etag = make_etag(op_id, version)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    req = await get_request_detail(db, op_id)
+    if not req:
+        raise HTTPException(404, "Not found")
+    return json_response(request, _detail_dict(req), etag)
 
 @app.get("/requests/{op_id}/history", response_model=list[HistoryOut])
-def api_get_history(op_id: str, db: Session = Depends(get_db)):
-    req = get_request(db, op_id)
-    if not req:
+async def api_get_history(
+    op_id: str,
+    request: Request,
+    date_from: date | None = Query(None, alias="from", description="entries on or after (YYYY-MM-DD)"),
+    date_to: date | None = Query(None, alias="to", description="entries on or before (YYYY-MM-DD)"),
+    db: AsyncSession = Depends(get_db),
+):
+    version = await request_version(db, op_id)
+    if version is None:
         raise HTTPException(404, "Not found")
-    hist = get_history(db, op_id)
-    return [HistoryOut(at=h.at, department=h.department, from_status=h.from_status, to_status=h.to_status, comment=h.comment) for h in hist]
+    etag = make_etag(f"{op_id}-history", version)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    return json_response(request, [_history_dict(h) for h in await get_history(db, op_id, _iso(date_from), _iso(date_to))], etag)
 
 @app.post("/requests/{op_id}/status", response_model=RequestOut)
-def api_update_status(op_id: str, body: StatusUpdateIn, db: Session = Depends(get_db)):
-    req = get_request(db, op_id)
-    if not req:
+async def api_update_status(op_id: str, body: StatusUpdateIn, db: AsyncSession = Depends(get_db)):
+    _validate_status_update(body.to_status, body.department, body.comment)
+    try:
+        updated = await update_status(db, op_id, body.department, body.to_status, body.comment.strip(), body.planned_date)
+    except TransitionRejected as e:
+        raise HTTPException(400, str(e))
+    if updated is None:
         raise HTTPException(404, "Not found")
+    return _to_request_out(updated)
 
-    # validate enums lightly
-    try:
-        cur = Status(req.status)
-        to = Status(body.to_status)
-        Department(body.department)
-    except Exception:
-        raise HTTPException(400, "Invalid status/department")
+@app.post("/requests/status:batch", response_model=BatchStatusUpdateOut)
+async def api_batch_update_status(body: BatchStatusUpdateIn, db: AsyncSession = Depends(get_db)):
+    _validate_status_update(body.to_status, body.department, body.comment)
+    if body.op_ids is None and body.filter is None:
+        raise HTTPException(400, "op_ids or filter is required")
+    if body.op_ids is None:
+        f = body.filter
+        if not ((f.status and f.status != "ALL") or any(v and v.strip() for v in (f.q, f.site, f.zone))):
+            raise HTTPException(400, "filter needs at least one of status (other than ALL), q, site or zone")
 
-    if to not in ALLOWED_TRANSITIONS[cur]:
-        raise HTTPException(400, f"Transition not allowed: {cur.value} -> {to.value}")
+    try:
+        results = await batch_update_status(
+            db,
+            op_ids=body.op_ids,
+            filters=body.filter.model_dump() if body.filter else None,
+            department=body.department,
+            to_status=body.to_status,
+            comment=body.comment.strip(),
+            planned_date=body.planned_date,
+        )
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    out = [BatchStatusResultOut(op_id=op_id, ok=err is None, error=err) for op_id, err in results]
+    accepted = sum(1 for r in out if r.ok)
+    return BatchStatusUpdateOut(accepted=accepted, rejected=len(out) - accepted, results=out)
 
-    if not body.comment.strip():
+def _validate_status_update(to_status: str, department: str, comment: str) -> None:
+    try:
+        rule_for(to_status, department)
+    except TransitionRejected as e:
+        raise HTTPException(400, str(e))
+    if not comment.strip():
         raise HTTPException(400, "Comment is required")
 
-    updated = update_status(db, op_id, body.department, body.to_status, body.comment.strip(), body.planned_date)
-    return _to_request_out(updated)
-
 @app.get("/planning", response_model=list[RequestOut])
-def api_planning(db: Session = Depends(get_db)):
-    items = list_planning(db)
-    return [_to_request_out(r) for r in items]
+async def api_planning(
+    request: Request,
+    date_from: date | None = Query(None, alias="from", description="planned on or after (YYYY-MM-DD)"),
+    date_to: date | None = Query(None, alias="to", description="planned on or before (YYYY-MM-DD)"),
+    db: AsyncSession = Depends(get_db),
+):
+    """PLANNED operations by planned date, undated ones last; with from/to, only those dated in the range."""
+    etag = make_etag("planning", await table_version(db))
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    return json_response(request, await list_planning(db, _iso(date_from), _iso(date_to)), etag)
+
+@app.get("/planning/conflicts", response_model=PlanningConflictsOut)
+async def api_planning_conflicts(
+    request: Request,
+    window_days: int = Query(SITE_WINDOW_DAYS, ge=1, le=90),
+    db: AsyncSession = Depends(get_db),
+):
+    """Sites changed twice within `window_days` and zone/days above capacity, among PLANNED operations."""
+    etag = make_etag(f"conflicts-{window_days}", await table_version(db))
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    return json_response(request, find_conflicts(await planned_operations(db), window_days), etag)
+
+@app.get("/planning/suggest", response_model=PlanningSuggestOut)
+async def api_planning_suggest(
+    request: Request,
+    start: date | None = None,
+    horizon_days: int = Query(60, ge=1, le=366),
+    window_days: int = Query(SITE_WINDOW_DAYS, ge=1, le=90),
+    limit: int = Query(1000, ge=1, le=50000),
+    db: AsyncSession = Depends(get_db),
+):
+    """Proposed dates for the oldest `limit` PENDING requests (nothing is written), highest priority first,
+    respecting zone capacity and the site window around PLANNED operations. Defaults to starting tomorrow."""
+    start_day = start or date.fromisoformat(days_ago_iso(-1))
+    etag = make_etag(f"suggest-{start_day}-{horizon_days}-{window_days}-{limit}", await table_version(db))
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    plan = suggest_schedule(await planned_operations(db), await pending_operations(db, limit), start_day, horizon_days, window_days)
+    return json_response(request, plan, etag)
+
+def _export_response(kind: str, fmt: str, stmts, columns) -> StreamingResponse:
+    filename = f"{kind}-{days_ago_iso(0)}.{'csv' if fmt == 'csv' else 'ndjson'}"
+    return StreamingResponse(
+        stream_export(stmts, columns, fmt),
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+@app.get("/export/requests")
+async def api_export_requests(
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    status: str = Query("ALL"),
+    zone: str | None = Query(None),
+    date_from: date | None = Query(None, alias="from", description="created on or after (YYYY-MM-DD)"),
+    date_to: date | None = Query(None, alias="to", description="created on or before (YYYY-MM-DD)"),
+):
+    """Every matching request, streamed as CSV or NDJSON in constant memory."""
+    stmt = export_requests_stmt(status, zone, _iso(date_from), _iso(date_to))
+    return _export_response("requests", format, [stmt], [c.key for c in REQUEST_COLUMNS])
+
+@app.get("/export/history")
+async def api_export_history(
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    status: str = Query("ALL", description="current status of the request"),
+    zone: str | None = Query(None),
+    date_from: date | None = Query(None, alias="from", description="entries on or after (YYYY-MM-DD)"),
+    date_to: date | None = Query(None, alias="to", description="entries on or before (YYYY-MM-DD)"),
+):
+    """History entries (archived ones included, after the others), streamed as CSV or NDJSON."""
+    stmts = export_history_stmts(status, zone, _iso(date_from), _iso(date_to), archived=has_archive(engine))
+    return _export_response("history", format, stmts, [c.key for c in HISTORY_COLUMNS])
+
+@app.get("/stats", response_model=StatsOut)
+async def api_stats(request: Request, days: int = Query(30, ge=1, le=366), db: AsyncSession = Depends(get_db)):
+    """Counts by status/zone/priority/feature, transitions per day and department over the last `days` days,
+    mean time between statuses and failure rate; served from counter tables."""
+    etag = make_etag(f"stats-{days}-{days_ago_iso(0)}", await table_version(db))
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    return json_response(request, await get_stats(db, days_ago_iso(days - 1)), etag)
 
 @app.post("/assistant", response_model=AssistantOut)
-def api_assistant(body: AssistantIn, db: Session = Depends(get_db)):
-    answer_text, refs = assistant_answer(db, body.question)
+async def api_assistant(body: AssistantIn, db: AsyncSession = Depends(get_db)):
+    answer_text, refs = await assistant_answer(db, body.question)
     return AssistantOut(answer=answer_text, references=refs)
 
+@app.get("/assistant/cache")
+async def api_assistant_cache():
+    """Hit/miss counters of the assistant caches (per worker process)."""
+    return assistant_cache_stats()
+
+# plain dicts in the RequestDetailOut / HistoryOut shapes, for json_response
+def _history_dict(h) -> dict:
+    return {"at": h.at, "department": h.department, "from_status": h.from_status, "to_status": h.to_status, "comment": h.comment}
+
+def _detail_dict(r) -> dict:
+    return {"request": {name: getattr(r, name) for name in RequestOut.model_fields}, "history": [_history_dict(h) for h in r.history]}
+
 def _to_request_out(r) -> RequestOut:
     return RequestOut(
         op_id=r.op_id,
@@ -127,6 +371,7 @@ def _to_request_out(r) -> RequestOut:
         value=r.value,
         zone=r.zone,
         sites=r.sites,
+        site_count=r.site_count,
         desired_date=r.desired_date,
         planned_date=r.planned_date,
         priority=r.priority,
@@ -0,0 +1,185 @@
+from __future__ import annotations
+import contextvars
+import logging
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# In-process metrics rendered in the Prometheus text format at GET /metrics.
+# Each worker process keeps its own values; scrape every worker (or use one).
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name, self.help, self.label_names = name, help, tuple(labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        lines += [f"{self.name}{_labels(self.label_names, k)} {_number(v)}" for k, v in values]
+        return lines
+
+class Histogram:
+    def __init__(self, name: str, help: str, buckets: Sequence[float], labels: Sequence[str] = ()):
+        self.name, self.help, self.label_names = name, help, tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        # per label set: [count per bucket..., +Inf count, sum]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def observe(self, value: float, *labels: str) -> None:
+        with self._lock:
+            slots = self._values.setdefault(labels, [0] * (len(self.buckets) + 2))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    slots[i] += 1
+            slots[-2] += 1
+            slots[-1] += value
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted((k, list(v)) for k, v in self._values.items())
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for k, slots in values:
+            for bound, n in zip(self.buckets, slots):
+                le = 'le="%s"' % _number(bound)
+                lines.append(f"{self.name}_bucket{_labels(self.label_names, k, le)} {_number(n)}")
+            le = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{_labels(self.label_names, k, le)} {_number(slots[-2])}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, k)} {_number(slots[-2])}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, k)} {_number(slots[-1])}")
+        return lines
+
+REGISTRY: List[object] = []
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 500, 1000, 10000)
+
+HTTP_DURATION = Histogram("http_request_duration_seconds", "Time to serve a request, until the last body byte.", LATENCY_BUCKETS, ("method", "route", "status"))
+HTTP_QUERIES = Histogram("http_request_db_queries", "SQL statements executed per request.", COUNT_BUCKETS, ("route",))
+HTTP_ROWS = Histogram("http_request_db_rows", "Rows returned by database reads per request.", COUNT_BUCKETS, ("route",))
+DB_QUERY_DURATION = Histogram("db_query_duration_seconds", "SQL statement execution time.", LATENCY_BUCKETS)
+DB_SLOW_QUERIES = Counter("db_slow_queries_total", "Statements slower than SLOW_QUERY_MS.")
+LLM_DURATION = Histogram("llm_request_duration_seconds", "LLM API call duration.", LATENCY_BUCKETS, ("operation", "outcome"))
+LLM_TOKENS = Counter("llm_tokens_total", "LLM tokens used.", ("operation", "kind"))
+
+def render() -> str:
+    return "\n".join(line for metric in REGISTRY for line in metric.render()) + "\n"
+
+@dataclass
+class RequestStats:
+    queries: int = 0
+    rows: int = 0
+
+# set by MetricsMiddleware for the duration of a request; db.run_write_async copies it to the writer thread
+current_request: contextvars.ContextVar[Optional[RequestStats]] = contextvars.ContextVar("current_request", default=None)
+
+def add_rows(n: int) -> None:
+    """Count rows read for the current request. The readers report their own results
+    (repo_async, exports, the assistant): the DBAPI cursor does not expose a row count."""
+    stats = current_request.get()
+    if stats is not None:
+        stats.rows += n
+
+class MetricsMiddleware:
+    """Per-route latency, SQL statement and row counts (route = path template, not the raw URL)."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self._routes: Dict[object, str] = {}
+
+    def _route(self, scope: Scope) -> str:
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "unmatched"
+        if endpoint not in self._routes:
+            for route in scope["app"].routes:
+                self._routes[getattr(route, "endpoint", None)] = getattr(route, "path", "unknown")
+        return self._routes.get(endpoint, "unknown")
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        stats = RequestStats()
+        token = current_request.set(stats)
+        status = "500"
+        start = time.perf_counter()
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_request.reset(token)
+            route = self._route(scope)
+            HTTP_DURATION.observe(time.perf_counter() - start, scope["method"], route, status)
+            HTTP_QUERIES.observe(stats.queries, route)
+            HTTP_ROWS.observe(stats.rows, route)
+
+slow_query_log = logging.getLogger("app.slow_query")
+# opt-in: log statements slower than this many milliseconds with their query plan
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "0") or 0)
+
+_EXPLAINABLE = re.compile(r"\s*(SELECT|WITH|INSERT|UPDATE|DELETE)\b", re.IGNORECASE)
+
+def _explain(dbapi_connection, statement: str, parameters) -> str:
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute("EXPLAIN QUERY PLAN " + statement, parameters or ())
+        return "; ".join(str(row[3]) for row in cursor.fetchall())
+    except Exception as e:  # the plan is best effort, the query already ran
+        return f"unavailable ({e.__class__.__name__})"
+    finally:
+        cursor.close()
+
+def instrument_engine(engine: Engine) -> None:
+    """Time every statement, count statements per request and log slow ones."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info["query_start"] = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start"]
+        DB_QUERY_DURATION.observe(elapsed)
+        stats = current_request.get()
+        if stats is not None:
+            stats.queries += 1
+        if SLOW_QUERY_MS and elapsed * 1000 >= SLOW_QUERY_MS:
+            DB_SLOW_QUERIES.inc()
+            explainable = not executemany and engine.dialect.name == "sqlite" and _EXPLAINABLE.match(statement)
+            plan = _explain(conn.connection.dbapi_connection, statement, parameters) if explainable else "n/a"
+            slow_query_log.warning("slow query %.1f ms: %s | params=%r | plan: %s", elapsed * 1000, statement, parameters, plan)
@@ -0,0 +1,201 @@
+from __future__ import annotations
+import json
+import sys
+from typing import Callable, List, Tuple
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+from .archive import archive_attached
+from .utils import DATE_GLOB, TIMESTAMP_GLOB, normalize_date, normalize_timestamp, now_iso, split_sites
+from .search import install_fts, rebuild_fts
+from .stats import install_stats, rebuild_stats
+
+# Ordered schema migrations for existing databases. New tables/indexes declared
+# on the models are created by create_all; migrations cover what create_all
+# cannot do (virtual tables, triggers, backfills, indexes on existing tables).
+# Every migration must be idempotent so it is safe on a fresh database.
+MIGRATIONS: List[Tuple[str, Callable[[Connection], None]]] = []
+
+def migration(revision: str):
+    def register(fn: Callable[[Connection], None]):
+        MIGRATIONS.append((revision, fn))
+        return fn
+    return register
+
+@migration("0001_requests_fts")
+def _requests_fts(conn: Connection) -> None:
+    install_fts(conn)
+    rebuild_fts(conn)
+
+@migration("0002_request_sites")
+def _request_sites(conn: Connection) -> None:
+    # FTS triggers no longer read requests.sites
+    conn.exec_driver_sql("DROP TRIGGER IF EXISTS requests_fts_ai")
+    conn.exec_driver_sql("DROP TRIGGER IF EXISTS requests_fts_au")
+    install_fts(conn)
+    legacy = conn.execute(text(
+        "SELECT op_id, sites FROM requests r WHERE coalesce(sites, '') != '' "
+        "AND NOT EXISTS (SELECT 1 FROM request_sites s WHERE s.request_op_id = r.op_id)"
+    )).all()
+    rows = [
+        {"op_id": op_id, "position": i, "site": site}
+        for op_id, csv in legacy
+        for i, site in enumerate(split_sites(csv))
+    ]
+    if rows:
+        conn.execute(text("INSERT INTO request_sites (request_op_id, position, site) VALUES (:op_id, :position, :site)"), rows)
+    conn.exec_driver_sql("UPDATE requests SET sites = '' WHERE sites != ''")
+    rebuild_fts(conn)
+
+@migration("0003_op_sequences")
+def _op_sequences(conn: Connection) -> None:
+    # seed each year's counter from the highest existing op_id (OP-YYYY-N...)
+    conn.execute(text("""
+        INSERT INTO op_sequences (year, last_value)
+        SELECT CAST(substr(op_id, 4, 4) AS INTEGER), max(CAST(substr(op_id, 9) AS INTEGER))
+        FROM requests
+        WHERE op_id LIKE 'OP-____-%'
+        GROUP BY substr(op_id, 4, 4)
+        ON CONFLICT (year) DO UPDATE SET last_value = max(op_sequences.last_value, excluded.last_value)
+    """))
+
+@migration("0004_composite_indexes")
+def _composite_indexes(conn: Connection) -> None:
+    from .models import Request, HistoryEntry
+    wanted = {
+        "ix_requests_updated_at_id",
+        "ix_requests_status_updated_at",
+        "ix_requests_status_planned_date",
+        "ix_history_request_op_id_at",
+    }
+    for index in list(Request.__table__.indexes) + list(HistoryEntry.__table__.indexes):
+        if index.name in wanted:
+            index.create(bind=conn, checkfirst=True)
+
+@migration("0005_stat_counters")
+def _stat_counters(conn: Connection) -> None:
+    install_stats(conn)
+    rebuild_stats(conn)
+
+# (table, column, normalizer, GLOB of the canonical form, nullable)
+_DATE_COLUMNS = [
+    ("requests", "desired_date", normalize_date, DATE_GLOB, True),
+    ("requests", "planned_date", normalize_date, DATE_GLOB, True),
+    ("requests", "created_at", normalize_timestamp, TIMESTAMP_GLOB, False),
+    ("requests", "updated_at", normalize_timestamp, TIMESTAMP_GLOB, False),
+    ("history", "at", normalize_timestamp, TIMESTAMP_GLOB, False),
+]
+
+def _normalized(normalizer, value):
+    try:
+        return normalizer(value)
+    except ValueError:
+        return None
+
+@migration("0006_typed_dates")
+def _typed_dates(conn: Connection) -> None:
+    # rewrite dates/timestamps not already in canonical form (models.ISODate /
+    # ISOTimestamp); unparseable dates become NULL, unparseable timestamps are kept
+    from .models import Request, HistoryEntry
+    for table, column, normalizer, glob, nullable in _DATE_COLUMNS:
+        rows = conn.execute(text(
+            f"SELECT rowid, {column} FROM {table} WHERE {column} IS NOT NULL AND {column} NOT GLOB :glob"
+        ), {"glob": glob}).all()
+        updates = []
+        for rowid, value in rows:
+            fixed = _normalized(normalizer, value)
+            if fixed is not None or nullable:
+                updates.append({"rowid": rowid, "value": fixed})
+        if updates:
+            conn.execute(text(f"UPDATE {table} SET {column} = :value WHERE rowid = :rowid"), updates)
+    if archive_attached(conn):
+        archived = conn.execute(text("SELECT request_op_id, month, entries FROM archive.history_archive")).all()
+        changed = []
+        for op_id, month, raw in archived:
+            entries = json.loads(raw)
+            fixed = [[e[0], _normalized(normalize_timestamp, e[1]) or e[1], *e[2:]] for e in entries]
+            if fixed != entries:
+                changed.append({"op_id": op_id, "month": month, "entries": json.dumps(fixed, ensure_ascii=False, separators=(",", ":"))})
+        if changed:
+            conn.execute(text(
+                "UPDATE archive.history_archive SET entries = :entries WHERE request_op_id = :op_id AND month = :month"
+            ), changed)
+    for index in list(Request.__table__.indexes) + list(HistoryEntry.__table__.indexes):
+        if index.name in ("ix_requests_created_at_id", "ix_history_at"):
+            index.create(bind=conn, checkfirst=True)
+    # history days may have moved (time zones, formats)
+    install_stats(conn)
+    rebuild_stats(conn)
+
+@migration("0007_drop_history_op_id_index")
+def _drop_history_op_id_index(conn: Connection) -> None:
+    # ix_history_request_op_id_at (0004) starts with the same column and serves the
+    # same lookups; the single-column index only cost every history insert
+    conn.exec_driver_sql("DROP INDEX IF EXISTS ix_history_request_op_id")
+
+def _ensure_version_table(conn: Connection) -> None:
+    conn.exec_driver_sql(
+        "CREATE TABLE IF NOT EXISTS schema_migrations (revision VARCHAR PRIMARY KEY, applied_at VARCHAR NOT NULL)"
+    )
+
+def applied_revisions(conn: Connection) -> List[str]:
+    _ensure_version_table(conn)
+    return list(conn.execute(text("SELECT revision FROM schema_migrations ORDER BY revision")).scalars())
+
+def upgrade(engine: Engine) -> List[str]:
+    """Apply pending migrations, each in its own transaction. Returns the applied revisions."""
+    done: List[str] = []
+    with engine.begin() as conn:
+        already = set(applied_revisions(conn))
+    for revision, fn in MIGRATIONS:
+        if revision in already:
+            continue
+        with engine.begin() as conn:
+            fn(conn)
+            conn.execute(
+                text("INSERT INTO schema_migrations (revision, applied_at) VALUES (:r, :at)"),
+                {"r": revision, "at": now_iso()},
+            )
+        done.append(revision)
+    return done
+
+def main(argv: List[str]) -> int:
+    from .db import engine
+    from .models import Base
+
+    cmd = argv[0] if argv else "upgrade"
+    if cmd == "upgrade":
+        Base.metadata.create_all(bind=engine)
+        for revision in upgrade(engine):
+            print(f"applied {revision}")
+        return 0
+    if cmd == "status":
+        with engine.begin() as conn:
+            already = set(applied_revisions(conn))
+        for revision, _ in MIGRATIONS:
+            print(f"{'x' if revision in already else ' '} {revision}")
+        return 0
+    if cmd == "check-plans":
+        from .query_plans import check_query_plans
+        problems = check_query_plans(engine)
+        for p in problems:
+            print(p, file=sys.stderr)
+        print("query plans ok" if not problems else f"{len(problems)} query plan problem(s)")
+        return 1 if problems else 0
+    if cmd == "rebuild-fts":
+        with engine.begin() as conn:
+            install_fts(conn)
+            rebuild_fts(conn)
+        print("requests_fts rebuilt")
+        return 0
+    if cmd == "rebuild-stats":
+        with engine.begin() as conn:
+            install_stats(conn)
+            rebuild_stats(conn)
+        print("stat counters rebuilt")
+        return 0
+    print("usage: python -m app.migrations [upgrade|status|check-plans|rebuild-fts|rebuild-stats]", file=sys.stderr)
+    return 2
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
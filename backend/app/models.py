@@ -1,8 +1,27 @@
-from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
-from sqlalchemy import String, Integer, Text, ForeignKey
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship, column_property
+from sqlalchemy import String, Integer, Text, ForeignKey, Index, select, func, desc
+from sqlalchemy.types import TypeDecorator
 from datetime import datetime
 from typing import List, Optional
 
+from .utils import normalize_date, normalize_timestamp
+
+class ISODate(TypeDecorator):
+    """Calendar date stored as YYYY-MM-DD text; any accepted input is normalized on write."""
+    impl = String
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return normalize_date(value)
+
+class ISOTimestamp(TypeDecorator):
+    """UTC instant stored as YYYY-MM-DDTHH:MM:SSZ text; a bare date compares as its midnight."""
+    impl = String
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return normalize_timestamp(value)
+
 class Base(DeclarativeBase):
     pass
 
@@ -14,27 +33,76 @@ class Request(Base):
     parameter: Mapped[str] = mapped_column(String)
     value: Mapped[str] = mapped_column(String)
     zone: Mapped[str] = mapped_column(String)
-    sites: Mapped[str] = mapped_column(Text)  # CSV for demo
-    desired_date: Mapped[Optional[str]] = mapped_column(String, nullable=True)
-    planned_date: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    # legacy CSV column, superseded by request_sites; `sites` below is computed from it
+    legacy_sites: Mapped[str] = mapped_column("sites", Text, default="")
+    desired_date: Mapped[Optional[str]] = mapped_column(ISODate, nullable=True)
+    planned_date: Mapped[Optional[str]] = mapped_column(ISODate, nullable=True)
     priority: Mapped[str] = mapped_column(String)
     initial_comment: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
     status: Mapped[str] = mapped_column(String)
-    created_at: Mapped[str] = mapped_column(String)
-    updated_at: Mapped[str] = mapped_column(String)
+    created_at: Mapped[str] = mapped_column(ISOTimestamp)
+    updated_at: Mapped[str] = mapped_column(ISOTimestamp)
 
+    # raise_on_sql: history must be loaded explicitly (repo.get_request_detail) rather than lazily per access
     history: Mapped[List["HistoryEntry"]] = relationship(
-        back_populates="request", cascade="all, delete-orphan", order_by="HistoryEntry.at"
+        back_populates="request", cascade="all, delete-orphan", order_by="HistoryEntry.at", lazy="raise_on_sql"
+    )
+
+    __table_args__ = (
+        # serves the keyset pagination of GET /requests
+        Index("ix_requests_updated_at_id", "updated_at", "id"),
+        # status-filtered listing and planning, both read in index order
+        Index("ix_requests_status_updated_at", "status", "updated_at"),
+        Index("ix_requests_status_planned_date", "status", "planned_date", desc("updated_at")),
+        # from/to filters on creation date (GET /requests, exports)
+        Index("ix_requests_created_at_id", "created_at", "id"),
     )
 
 class HistoryEntry(Base):
     __tablename__ = "history"
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
-    request_op_id: Mapped[str] = mapped_column(String, ForeignKey("requests.op_id", ondelete="CASCADE"), index=True)
-    at: Mapped[str] = mapped_column(String)
+    request_op_id: Mapped[str] = mapped_column(String, ForeignKey("requests.op_id", ondelete="CASCADE"))
+    at: Mapped[str] = mapped_column(ISOTimestamp)
     department: Mapped[str] = mapped_column(String)
     from_status: Mapped[Optional[str]] = mapped_column(String, nullable=True)
     to_status: Mapped[str] = mapped_column(String)
     comment: Mapped[str] = mapped_column(Text)
 
-    request: Mapped["Request"] = relationship(back_populates="history")
+    request: Mapped["Request"] = relationship(back_populates="history", lazy="raise_on_sql")
+
+    __table_args__ = (
+        Index("ix_history_request_op_id_at", "request_op_id", "at"),
+        # history date ranges across requests (exports)
+        Index("ix_history_at", "at"),
+    )
+
+class OpSequence(Base):
+    """Per-year op_id counter, bumped atomically in the same transaction as the insert."""
+    __tablename__ = "op_sequences"
+    year: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+    last_value: Mapped[int] = mapped_column(Integer, default=0)
+
+class RequestSite(Base):
+    __tablename__ = "request_sites"
+    request_op_id: Mapped[str] = mapped_column(String, ForeignKey("requests.op_id", ondelete="CASCADE"), primary_key=True)
+    position: Mapped[int] = mapped_column(Integer, primary_key=True)
+    site: Mapped[str] = mapped_column(String)
+
+    __table_args__ = (
+        # covering index for "which operations touch site X"
+        Index("ix_request_sites_site", "site", "request_op_id"),
+    )
+
+# backward-compatible CSV view of the normalized sites (rows come back in PK order)
+Request.sites = column_property(
+    select(func.coalesce(func.group_concat(RequestSite.site, ","), ""))
+    .where(RequestSite.request_op_id == Request.op_id)
+    .correlate_except(RequestSite)
+    .scalar_subquery()
+)
+Request.site_count = column_property(
+    select(func.count())
+    .where(RequestSite.request_op_id == Request.op_id)
+    .correlate_except(RequestSite)
+    .scalar_subquery()
+)
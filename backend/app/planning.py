@@ -0,0 +1,147 @@
+from __future__ import annotations
+import os
+from collections import defaultdict
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Planning engine behind /planning/conflicts and /planning/suggest. Works on
+# (op_id, zone, priority, date, sites) tuples loaded in one query each
+# (repo.planned_operations / repo.pending_operations); everything else is
+# sorting and hashing, O(n log n) in the number of operation-site pairs.
+
+def _parse_capacities(raw: str) -> Dict[str, int]:
+    out: Dict[str, int] = {}
+    for part in raw.split(","):
+        zone, sep, n = part.partition("=")
+        if sep and zone.strip() and n.strip().isdigit():
+            out[zone.strip()] = int(n)
+    return out
+
+# operations per zone and day; PLANNING_ZONE_CAPACITIES overrides per zone ("Paris=8,Lyon=3")
+DEFAULT_ZONE_CAPACITY = int(os.getenv("PLANNING_ZONE_CAPACITY", "5"))
+ZONE_CAPACITIES = _parse_capacities(os.getenv("PLANNING_ZONE_CAPACITIES", ""))
+# two changes on one site closer than this many days conflict (1 = same day)
+SITE_WINDOW_DAYS = int(os.getenv("PLANNING_SITE_WINDOW_DAYS", "1"))
+
+PRIORITY_RANK = {"High": 0, "Medium": 1, "Low": 2}
+
+def zone_capacity(zone: str) -> int:
+    return ZONE_CAPACITIES.get(zone, DEFAULT_ZONE_CAPACITY)
+
+def parse_day(value: Optional[str]) -> Optional[date]:
+    try:
+        return date.fromisoformat(value[:10]) if value else None
+    except ValueError:
+        return None
+
+Operation = Tuple[str, str, str, Optional[str], List[str]]  # op_id, zone, priority, date, sites
+
+def group_sites(rows: Iterable[Tuple[str, str, str, Optional[str], Optional[str]]]) -> List[Operation]:
+    """Fold (op_id, zone, priority, date, site) join rows into one operation per op_id, first-seen order."""
+    ops: Dict[str, Operation] = {}
+    for op_id, zone, priority, day, site in rows:
+        op = ops.get(op_id)
+        if op is None:
+            op = ops[op_id] = (op_id, zone, priority, day, [])
+        if site:
+            op[4].append(site)
+    return list(ops.values())
+
+def find_conflicts(planned: List[Operation], window_days: int = SITE_WINDOW_DAYS) -> Dict[str, Any]:
+    """Sites changed twice within `window_days`, and zone/days above capacity."""
+    by_site: Dict[str, List[Tuple[date, str]]] = defaultdict(list)
+    by_zone_day: Dict[Tuple[str, date], List[str]] = defaultdict(list)
+    for op_id, zone, _, raw_day, sites in planned:
+        day = parse_day(raw_day)
+        if day is None:
+            continue
+        by_zone_day[(zone, day)].append(op_id)
+        for site in set(sites):
+            by_site[site].append((day, op_id))
+
+    site_conflicts = []
+    for site, visits in by_site.items():
+        if len(visits) < 2:
+            continue
+        # by day only: same-day visits keep the query order (Request.id), op_ids do not sort as text
+        visits.sort(key=lambda v: v[0])
+        # sweep: consecutive visits closer than the window chain into one cluster
+        cluster = [visits[0]]
+        for visit in visits[1:]:
+            if (visit[0] - cluster[-1][0]).days < window_days:
+                cluster.append(visit)
+                continue
+            if len(cluster) > 1:
+                site_conflicts.append(_site_conflict(site, cluster))
+            cluster = [visit]
+        if len(cluster) > 1:
+            site_conflicts.append(_site_conflict(site, cluster))
+    site_conflicts.sort(key=lambda c: (c["first_date"], c["site"]))
+
+    zone_conflicts = [
+        {"zone": zone, "date": day.isoformat(), "count": len(op_ids), "capacity": zone_capacity(zone), "op_ids": op_ids}
+        for (zone, day), op_ids in sorted(by_zone_day.items(), key=lambda kv: (kv[0][1], kv[0][0]))
+        if len(op_ids) > zone_capacity(zone)
+    ]
+    return {"window_days": window_days, "sites": site_conflicts, "zones": zone_conflicts}
+
+def _site_conflict(site: str, cluster: List[Tuple[date, str]]) -> Dict[str, Any]:
+    return {
+        "site": site, "first_date": cluster[0][0].isoformat(), "last_date": cluster[-1][0].isoformat(),
+        "op_ids": [op_id for _, op_id in cluster],
+    }
+
+def suggest_schedule(
+    planned: List[Operation],
+    pending: List[Operation],
+    start: date,
+    horizon_days: int,
+    window_days: int = SITE_WINDOW_DAYS,
+) -> Dict[str, Any]:
+    """Greedy dates for PENDING operations around what is already planned.
+
+    Highest priority first, then earliest desired date, then oldest request.
+    Each one gets the first day from max(start, desired_date) where its zone is
+    under capacity and none of its sites is changed within `window_days`.
+    """
+    zone_load: Dict[Tuple[str, int], int] = defaultdict(int)
+    site_days: Dict[str, set] = defaultdict(set)
+    for _, zone, _, raw_day, sites in planned:
+        day = parse_day(raw_day)
+        if day is None:
+            continue
+        zone_load[(zone, day.toordinal())] += 1
+        for site in sites:
+            site_days[site].add(day.toordinal())
+
+    first, last = start.toordinal(), start.toordinal() + horizon_days - 1
+    order = sorted(
+        enumerate(pending),
+        key=lambda e: (PRIORITY_RANK.get(e[1][2], len(PRIORITY_RANK)), parse_day(e[1][3]) or date.max, e[0]),
+    )
+    suggestions, unscheduled = [], []
+    for _, (op_id, zone, priority, desired, sites) in order:
+        wanted = parse_day(desired)
+        cap = zone_capacity(zone)
+        chosen = None
+        for d in range(max(first, wanted.toordinal() if wanted else first), last + 1):
+            if zone_load[(zone, d)] >= cap:
+                continue
+            if any(d + k in site_days[s] for s in sites for k in range(-window_days + 1, window_days)):
+                continue
+            chosen = d
+            break
+        if chosen is None:
+            unscheduled.append({"op_id": op_id, "zone": zone, "priority": priority, "desired_date": desired})
+            continue
+        zone_load[(zone, chosen)] += 1
+        for s in sites:
+            site_days[s].add(chosen)
+        suggestions.append({
+            "op_id": op_id, "zone": zone, "priority": priority, "desired_date": desired,
+            "suggested_date": date.fromordinal(chosen).isoformat(),
+        })
+    return {
+        "start": start.isoformat(), "horizon_days": horizon_days, "window_days": window_days,
+        "suggestions": suggestions, "unscheduled": unscheduled,
+    }
@@ -0,0 +1,62 @@
+from __future__ import annotations
+from typing import Any, List, NamedTuple
+from sqlalchemy import select
+from sqlalchemy.engine import Engine
+
+from . import repo
+from .archive import history_archive
+
+class PlanCheck(NamedTuple):
+    name: str
+    stmt: Any
+    index: str
+    allow_sort: bool = False
+
+def plan_checks() -> List[PlanCheck]:
+    """Hot queries and the index each one must be served from."""
+    dated, undated = repo.planning_stmts()
+    return [
+        PlanCheck("list requests", repo.page_stmt("ALL", None, 201), "ix_requests_updated_at_id"),
+        PlanCheck("list requests by status", repo.page_stmt("PLANNED", None, 201), "ix_requests_status_updated_at"),
+        PlanCheck(
+            "next page by status",
+            repo.page_stmt("PLANNED", None, 201, repo.encode_cursor("2026-01-01T00:00:00Z", 1)),
+            "ix_requests_status_updated_at",
+        ),
+        PlanCheck("planning (dated)", dated, "ix_requests_status_planned_date"),
+        PlanCheck("planning (undated)", undated, "ix_requests_status_planned_date"),
+        PlanCheck("planning in a week", repo.planning_stmts("2026-01-05", "2026-01-11")[0], "ix_requests_status_planned_date"),
+        PlanCheck("request history", repo.history_stmt("OP-2026-0001"), "ix_history_request_op_id_at"),
+        PlanCheck(
+            "request history in a range",
+            repo.history_stmt("OP-2026-0001", "2026-01-01", "2026-01-31"),
+            "ix_history_request_op_id_at",
+        ),
+        PlanCheck(
+            "archived history",
+            select(history_archive.c.entries).where(history_archive.c.request_op_id == "OP-2026-0001"),
+            "PRIMARY KEY",
+        ),
+        # the per-site result set is small; sorting it is expected
+        PlanCheck("requests by site", repo.page_stmt("ALL", None, 201, site="S1"), "ix_request_sites_site", allow_sort=True),
+    ]
+
+def explain(engine: Engine, stmt) -> List[str]:
+    sql = str(stmt.compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True}))
+    with engine.connect() as conn:
+        return [row[3] for row in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + sql)]
+
+def check_query_plans(engine: Engine) -> List[str]:
+    """Return one message per regression (missing index, full scan or sort step); empty when all plans are good."""
+    problems: List[str] = []
+    for check in plan_checks():
+        plan = explain(engine, check.stmt)
+        found: List[str] = []
+        if not any(check.index in line for line in plan):
+            found.append(f"does not use {check.index}")
+        if any(line.startswith("SCAN ") and " INDEX " not in line for line in plan):
+            found.append("full table scan")
+        if not check.allow_sort and any("TEMP B-TREE" in line for line in plan):
+            found.append("sorts with a temp B-tree")
+        problems.extend(f"{check.name}: {msg} (plan: {'; '.join(plan)})" for msg in found)
+    return problems
@@ -1,96 +1,598 @@
 from __future__ import annotations
-from typing import Optional, List, Dict, Any
-from sqlalchemy.orm import Session
-from sqlalchemy import select
-from .models import Request, HistoryEntry
-from .utils import now_iso
+import base64
+import itertools
+import json
+from datetime import date, timedelta
+from typing import Optional, List, Dict, Any, Iterable, Set, Tuple
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy import Row, select, insert, update, func, and_, or_, text, true
+from .models import Request, HistoryEntry, RequestSite
+from .utils import now_iso, normalize_timestamp
 from .constants import Status, Department
+from .state_machine import REQUIRABLE_FIELDS, TransitionRejected, rejection, rule_for
+from .search import requests_fts, build_match_query, BM25_WEIGHTS, FTS_SET_SITES
+from .events import history_event, publish
+from .archive import has_archive, history_archive
+from .planning import Operation, group_sites
+from .stats import stat_counters, stat_transitions, stat_durations, STAT_DIMENSIONS
 
-def next_op_id(db: Session) -> str:
-    year = now_iso()[:4]
-    prefix = f"OP-{year}-"
-    last = db.execute(
-        select(Request.op_id).where(Request.op_id.like(f"{prefix}%")).order_by(Request.op_id.desc()).limit(1)
-    ).scalar_one_or_none()
-    if not last:
-        return f"{prefix}0001"
+# Bumped after every committed write. Readers that keep derived state (assistant
+# snapshot, caches) compare it to know when to rebuild. It is per process:
+# other worker processes fall back on their TTLs.
+_version_counter = itertools.count(1)
+_data_version = 0
+
+def data_version() -> int:
+    return _data_version
+
+def _commit(db: Session, events: Optional[List[Dict[str, Any]]] = None) -> None:
+    """Commit, bump data_version and publish the change feed events of this transaction."""
+    global _data_version
+    db.commit()
+    _data_version = next(_version_counter)
+    if events:
+        publish(events)
+
+def _insert_history(db: Session, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Bulk-insert history rows; returns their change feed events (ids from RETURNING)."""
+    if not rows:
+        return []
+    ids = db.execute(
+        insert(HistoryEntry).returning(HistoryEntry.id, sort_by_parameter_order=True), rows
+    ).scalars().all()
+    return [history_event({**row, "id": hid}) for row, hid in zip(rows, ids)]
+
+# ON CONFLICT ... RETURNING: SQLite >= 3.35
+_ALLOCATE_OP_IDS = text(
+    "INSERT INTO op_sequences (year, last_value) VALUES (:year, :n) "
+    "ON CONFLICT (year) DO UPDATE SET last_value = op_sequences.last_value + :n "
+    "RETURNING last_value"
+)
+
+def format_op_id(year: int, n: int) -> str:
+    # at least 4 digits, wider past 9999, so op_ids do not sort as text: order by Request.id
+    return f"OP-{year}-{n:04d}"
+
+def allocate_op_ids(db: Session, count: int = 1) -> List[str]:
+    """Reserve `count` consecutive op_ids for the current year.
+
+    The sequence row is written in the caller's transaction, so the ids are only
+    consumed if that transaction commits, and concurrent writers serialize on it.
+    """
+    year = int(now_iso()[:4])
+    last = db.execute(_ALLOCATE_OP_IDS, {"year": year, "n": count}).scalar_one()
+    return [format_op_id(year, n) for n in range(last - count + 1, last + 1)]
+
+def _insert_sites(db: Session, items: List[Tuple[int, str, List[str]]]) -> None:
+    """Bulk-insert (request id, op_id, site codes) into request_sites and the FTS index."""
+    rows = [
+        {"request_op_id": op_id, "position": i, "site": site}
+        for _, op_id, sites in items
+        for i, site in enumerate(sites)
+    ]
+    if rows:
+        db.execute(insert(RequestSite), rows)
+    fts_rows = [{"id": rid, "sites": " ".join(sites)} for rid, _, sites in items if sites]
+    if fts_rows:
+        db.execute(FTS_SET_SITES, fts_rows)
+
+def _request_row(op_id: str, payload: Dict[str, Any], ts: str) -> Dict[str, Any]:
+    return {
+        "op_id": op_id,
+        "feature": payload["feature"].strip(),
+        "parameter": payload["parameter"].strip(),
+        "value": payload["value"].strip(),
+        "zone": payload["zone"].strip(),
+        "desired_date": (payload.get("desired_date") or None),
+        "planned_date": (payload.get("planned_date") or None),
+        "priority": payload.get("priority", "High"),
+        "initial_comment": (payload.get("initial_comment") or None),
+        "status": Status.PENDING.value,
+        "created_at": ts,
+        "updated_at": ts,
+    }
+
+def bulk_create_requests(db: Session, payloads: List[Dict[str, Any]]) -> List[str]:
+    """Insert many requests (plus sites and initial history) in one transaction.
+
+    op_ids are allocated as a single block and every table is written with one
+    executemany, so the cost per row is independent of the batch size.
+    """
+    if not payloads:
+        return []
+    op_ids = allocate_op_ids(db, len(payloads))
+    ts = now_iso()
+    inserted = db.execute(
+        insert(Request).returning(Request.id, Request.op_id, sort_by_parameter_order=True),
+        [_request_row(op_id, p, ts) for op_id, p in zip(op_ids, payloads)],
+    ).all()
+    _insert_sites(db, [(rid, op_id, p["sites"]) for (rid, op_id), p in zip(inserted, payloads)])
+    events = _insert_history(db, [
+        {
+            "request_op_id": op_id,
+            "at": ts,
+            "department": Department.ENGINEERING.value,
+            "from_status": None,
+            "to_status": Status.PENDING.value,
+            "comment": (p.get("initial_comment") or "Création de la demande."),
+        }
+        for op_id, p in zip(op_ids, payloads)
+    ])
+    _commit(db, events)
+    return op_ids
+
+def create_request(db: Session, payload: Dict[str, Any]) -> str:
+    return bulk_create_requests(db, [payload])[0]
+
+# columns exposed by RequestOut; list endpoints select these directly instead of ORM entities
+REQUEST_COLUMNS = (
+    Request.op_id,
+    Request.feature,
+    Request.parameter,
+    Request.value,
+    Request.zone,
+    Request.sites,
+    Request.site_count,
+    Request.desired_date,
+    Request.planned_date,
+    Request.priority,
+    Request.initial_comment,
+    Request.status,
+    Request.created_at,
+    Request.updated_at,
+)
+
+# request columns the list endpoints filter on by exact value
+FILTER_FIELDS = ("feature", "parameter", "priority")
+
+def _filter_requests(
+    stmt,
+    status: Optional[str],
+    q: Optional[str],
+    site: Optional[str] = None,
+    zone: Optional[str] = None,
+    fields: Optional[Dict[str, str]] = None,
+):
+    if status and status != "ALL":
+        stmt = stmt.where(Request.status == status)
+    if zone:
+        stmt = stmt.where(Request.zone == zone)
+    for name, value in (fields or {}).items():
+        stmt = stmt.where(getattr(Request, name) == value)
+    if site:
+        stmt = stmt.where(Request.op_id.in_(
+            select(RequestSite.request_op_id).where(RequestSite.site == site)
+        ))
+    match = build_match_query(q)
+    if match:
+        stmt = stmt.where(Request.id.in_(
+            select(requests_fts.c.rowid).where(requests_fts.c.requests_fts.match(match))
+        ))
+    return stmt
+
+def encode_cursor(updated_at: str, row_id: int) -> str:
+    raw = json.dumps([updated_at, row_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[str, int]:
     try:
-        n = int(last.split("-")[-1])
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        updated_at, row_id = json.loads(raw)
+        return normalize_timestamp(str(updated_at)), int(row_id)
     except Exception:
-        n = 0
-    return f"{prefix}{n+1:04d}"
+        raise ValueError("Invalid cursor")
 
-def create_request(db: Session, payload: Dict[str, Any]) -> str:
-    op_id = next_op_id(db)
-    ts = now_iso()
-    req = Request(
-        op_id=op_id,
-        feature=payload["feature"].strip(),
-        parameter=payload["parameter"].strip(),
-        value=payload["value"].strip(),
-        zone=payload["zone"].strip(),
-        sites=payload["sites"].strip(),
-        desired_date=(payload.get("desired_date") or None),
-        planned_date=(payload.get("planned_date") or None),
-        priority=payload.get("priority", "High"),
-        initial_comment=(payload.get("initial_comment") or None),
-        status=Status.PENDING.value,
-        created_at=ts,
-        updated_at=ts,
+def search_requests(db: Session, q: str, status: Optional[str], limit: int) -> List[Dict[str, Any]]:
+    """Full-text search ranked by bm25 (best match first), with prefix matching on every term."""
+    match = build_match_query(q)
+    if not match:
+        return []
+    stmt = (
+        select(*REQUEST_COLUMNS)
+        .join(requests_fts, requests_fts.c.rowid == Request.id)
+        .where(requests_fts.c.requests_fts.match(match))
     )
-    db.add(req)
-    db.add(HistoryEntry(
-        request_op_id=op_id,
-        at=ts,
-        department=Department.ENGINEERING.value,
-        from_status=None,
-        to_status=Status.PENDING.value,
-        comment=(payload.get("initial_comment") or "Création de la demande."),
-    ))
-    db.commit()
-    return op_id
-
-def list_requests(db: Session, status: Optional[str], q: Optional[str]) -> List[Request]:
-    stmt = select(Request)
     if status and status != "ALL":
         stmt = stmt.where(Request.status == status)
-    if q:
-        like = f"%{q}%"
-        stmt = stmt.where(
-            (Request.op_id.like(like)) | (Request.feature.like(like)) | (Request.parameter.like(like)) | (Request.zone.like(like))
-        )
-    stmt = stmt.order_by(Request.updated_at.desc())
-    return list(db.execute(stmt).scalars().all())
+    stmt = stmt.order_by(func.bm25(requests_fts.c.requests_fts, *BM25_WEIGHTS)).limit(limit)
+    return [dict(m) for m in db.execute(stmt).mappings()]
+
+def page_stmt(
+    status: Optional[str],
+    q: Optional[str],
+    limit: int,
+    cursor: Optional[str] = None,
+    site: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    fields: Optional[Dict[str, str]] = None,
+):
+    stmt = _filter_requests(select(*REQUEST_COLUMNS, Request.id), status, q, site, fields=fields)
+    stmt = stmt.where(*_date_range(Request.created_at, date_from, date_to))
+    if cursor:
+        cur_updated_at, cur_id = decode_cursor(cursor)
+        stmt = stmt.where(or_(
+            Request.updated_at < cur_updated_at,
+            and_(Request.updated_at == cur_updated_at, Request.id < cur_id),
+        ))
+    return stmt.order_by(Request.updated_at.desc(), Request.id.desc()).limit(limit)
+
+def list_requests_page(
+    db: Session,
+    status: Optional[str],
+    q: Optional[str],
+    limit: int,
+    cursor: Optional[str] = None,
+    site: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    fields: Optional[Dict[str, str]] = None,
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Keyset page ordered by (updated_at, id) desc, optionally created within [date_from, date_to]
+    and matching `fields` (FILTER_FIELDS name -> exact value); returns (rows, next_cursor)."""
+    stmt = page_stmt(status, q, limit + 1, cursor, site, date_from, date_to, fields)
+    rows = [dict(m) for m in db.execute(stmt).mappings()]
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]["updated_at"], rows[-1]["id"])
+    for r in rows:
+        del r["id"]
+    return rows, next_cursor
+
+def count_requests(
+    db: Session,
+    status: Optional[str],
+    q: Optional[str],
+    site: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    fields: Optional[Dict[str, str]] = None,
+) -> int:
+    stmt = _filter_requests(select(func.count()).select_from(Request), status, q, site, fields=fields)
+    return db.execute(stmt.where(*_date_range(Request.created_at, date_from, date_to))).scalar_one()
+
+def table_version(db: Session) -> str:
+    """Changes whenever any request or history row does: max(history.id) and max(updated_at), both index lookups."""
+    hist, updated = db.execute(select(
+        select(func.max(HistoryEntry.id)).scalar_subquery(),
+        select(func.max(Request.updated_at)).scalar_subquery(),
+    )).one()
+    return f"{hist or 0}.{updated or ''}"
+
+def request_version(db: Session, op_id: str) -> Optional[str]:
+    """table_version for a single request (None when it does not exist)."""
+    row = db.execute(
+        select(
+            Request.updated_at,
+            select(func.max(HistoryEntry.id)).where(HistoryEntry.request_op_id == op_id).scalar_subquery(),
+        ).where(Request.op_id == op_id)
+    ).first()
+    return None if row is None else f"{row[1] or 0}.{row[0]}"
 
 def get_request(db: Session, op_id: str) -> Optional[Request]:
     return db.execute(select(Request).where(Request.op_id == op_id)).scalar_one_or_none()
 
-def get_history(db: Session, op_id: str) -> List[HistoryEntry]:
-    return list(db.execute(select(HistoryEntry).where(HistoryEntry.request_op_id == op_id).order_by(HistoryEntry.at.asc())).scalars().all())
+def existing_op_ids(db: Session, op_ids: Iterable[str]) -> Set[str]:
+    found: Set[str] = set()
+    for part in _chunked(list(op_ids)):
+        found.update(db.execute(select(Request.op_id).where(Request.op_id.in_(part))).scalars())
+    return found
+
+def _archived_history(db: Session, op_ids: List[str]) -> Dict[str, List[HistoryEntry]]:
+    """History moved to the archive (app.archive), as detached HistoryEntry objects per op_id."""
+    out: Dict[str, List[HistoryEntry]] = {}
+    if db.get_bind().dialect.name != "sqlite" or not has_archive(db.connection()):
+        return out
+    for part in _chunked(op_ids):
+        stmt = select(history_archive.c.request_op_id, history_archive.c.entries).where(history_archive.c.request_op_id.in_(part))
+        for op_id, entries in db.execute(stmt):
+            out.setdefault(op_id, []).extend(
+                HistoryEntry(id=hid, request_op_id=op_id, at=at, department=dept, from_status=f, to_status=t, comment=c)
+                for hid, at, dept, f, t, c in json.loads(entries)
+            )
+    return out
+
+def _merge_history(hot: List[HistoryEntry], archived: List[HistoryEntry]) -> List[HistoryEntry]:
+    # an interrupted archive run can leave an entry in both places
+    seen = {h.id for h in hot}
+    return sorted([h for h in archived if h.id not in seen] + hot, key=lambda h: (h.at, h.id))
+
+def _with_archived_history(db: Session, reqs: List[Request]) -> List[Request]:
+    archived = _archived_history(db, [r.op_id for r in reqs])
+    for r in reqs:
+        if r.op_id in archived:
+            # loaded-state assignment: nothing to flush, the archive stays the only copy
+            set_committed_value(r, "history", _merge_history(list(r.history), archived[r.op_id]))
+    return reqs
 
-def update_status(db: Session, op_id: str, department: str, to_status: str, comment: str, planned_date: Optional[str]) -> Request:
-    req = get_request(db, op_id)
-    if not req:
-        raise ValueError("Request not found")
-    from_status = req.status
+def get_request_detail(db: Session, op_id: str) -> Optional[Request]:
+    """Request with its history loaded (indexed queries, no lazy loads), archived entries included."""
+    stmt = select(Request).where(Request.op_id == op_id).options(selectinload(Request.history))
+    req = db.execute(stmt).scalar_one_or_none()
+    return _with_archived_history(db, [req])[0] if req else None
+
+def get_request_details(db: Session, op_ids: List[str]) -> List[Request]:
+    """Many requests with their histories, in three queries whatever the number of ids."""
+    if not op_ids:
+        return []
+    stmt = select(Request).where(Request.op_id.in_(op_ids)).options(selectinload(Request.history))
+    return _with_archived_history(db, list(db.execute(stmt).scalars().all()))
+
+def history_stmt(op_id: str, date_from: Optional[str] = None, date_to: Optional[str] = None):
+    return (
+        select(HistoryEntry)
+        .where(HistoryEntry.request_op_id == op_id, *_date_range(HistoryEntry.at, date_from, date_to))
+        .order_by(HistoryEntry.at.asc())
+    )
+
+def get_history(db: Session, op_id: str, date_from: Optional[str] = None, date_to: Optional[str] = None) -> List[HistoryEntry]:
+    """History of one request, archived entries included, optionally dated within [date_from, date_to]."""
+    hot = list(db.execute(history_stmt(op_id, date_from, date_to)).scalars().all())
+    archived = _archived_history(db, [op_id]).get(op_id)
+    if archived and (date_from or date_to):
+        lo, hi = date_from or "", _day_after(date_to) if date_to else "9999"
+        archived = [h for h in archived if lo <= h.at < hi]
+    return _merge_history(hot, archived) if archived else hot
+
+HISTORY_COLUMNS = (
+    HistoryEntry.id,
+    HistoryEntry.request_op_id,
+    HistoryEntry.at,
+    HistoryEntry.department,
+    HistoryEntry.from_status,
+    HistoryEntry.to_status,
+    HistoryEntry.comment,
+)
+
+def _day_after(day: str) -> str:
+    return (date.fromisoformat(day) + timedelta(days=1)).isoformat()
+
+def _date_range(col, date_from: Optional[str], date_to: Optional[str]) -> List[Any]:
+    # stored dates/timestamps are canonical ISO text (models.ISODate/ISOTimestamp), so
+    # string ranges are chronological and indexable; both bounds are inclusive days (YYYY-MM-DD)
+    conds = []
+    if date_from:
+        conds.append(col >= date_from)
+    if date_to:
+        conds.append(col < _day_after(date_to))
+    return conds
+
+def export_requests_stmt(status: Optional[str], zone: Optional[str], date_from: Optional[str], date_to: Optional[str]):
+    """Requests matching the export filters (dates on created_at), in id order."""
+    stmt = _filter_requests(select(*REQUEST_COLUMNS), status, None, zone=zone)
+    return stmt.where(*_date_range(Request.created_at, date_from, date_to)).order_by(Request.id)
+
+def export_history_stmts(
+    status: Optional[str], zone: Optional[str], date_from: Optional[str], date_to: Optional[str], archived: bool = True
+) -> List[Any]:
+    """History of the requests matching status/zone, entries dated within the range: the hot
+    table, then the archive unless `archived` is false (no archive attached)."""
+    requests = _filter_requests(select(Request.op_id), status, None, zone=zone) if (status and status != "ALL") or zone else None
+    hot = select(*HISTORY_COLUMNS).where(*_date_range(HistoryEntry.at, date_from, date_to)).order_by(HistoryEntry.id)
+    if requests is not None:
+        hot = hot.where(HistoryEntry.request_op_id.in_(requests))
+    if not archived:
+        return [hot]
+    entries = func.json_each(history_archive.c.entries).table_valued("value").alias("e")
+    fields = [func.json_extract(entries.c.value, f"$[{i}]") for i in range(6)]
+    cold = (
+        select(
+            fields[0].label("id"), history_archive.c.request_op_id, fields[1].label("at"), fields[2].label("department"),
+            fields[3].label("from_status"), fields[4].label("to_status"), fields[5].label("comment"),
+        )
+        .select_from(history_archive.join(entries, true()))
+        .where(*_date_range(fields[1], date_from, date_to))
+    )
+    if requests is not None:
+        cold = cold.where(history_archive.c.request_op_id.in_(requests))
+    return [hot, cold]
+
+def history_events_since(db: Session, after_id: int, limit: int) -> List[Dict[str, Any]]:
+    """Change feed events with history id > after_id, oldest first (resume of GET /events)."""
+    stmt = (
+        select(HistoryEntry.id, HistoryEntry.request_op_id, HistoryEntry.at, HistoryEntry.department,
+               HistoryEntry.from_status, HistoryEntry.to_status, HistoryEntry.comment)
+        .where(HistoryEntry.id > after_id)
+        .order_by(HistoryEntry.id)
+        .limit(limit)
+    )
+    return [history_event(row) for row in db.execute(stmt).mappings()]
+
+def update_status(
+    db: Session, op_id: str, department: str, to_status: str, comment: str, planned_date: Optional[str]
+) -> Optional[Row]:
+    """Move one request to `to_status`; returns its REQUEST_COLUMNS row, None if it does not exist.
+
+    No pre-read: one conditional UPDATE per allowed source status, so a concurrent
+    change can never be overwritten. The row is only read to explain a rejection
+    (state_machine.TransitionRejected).
+    """
+    rule = rule_for(to_status, department)
     ts = now_iso()
-    req.status = to_status
+    values: Dict[str, Any] = {"status": to_status, "updated_at": ts}
     if planned_date:
-        req.planned_date = planned_date
-    req.updated_at = ts
-    db.add(req)
-    db.add(HistoryEntry(
-        request_op_id=op_id,
-        at=ts,
-        department=department,
-        from_status=from_status,
-        to_status=to_status,
-        comment=comment,
-    ))
-    db.commit()
-    db.refresh(req)
-    return req
+        values["planned_date"] = planned_date
+    guard = [getattr(Request, f).is_not(None) for f in rule.required if not values.get(f)]
+    for from_status in rule.sources:
+        row = db.execute(
+            update(Request)
+            .where(Request.op_id == op_id, Request.status == from_status, *guard)
+            .values(**values)
+            .returning(*REQUEST_COLUMNS)
+            .execution_options(synchronize_session=False)
+        ).first()
+        if row is not None:
+            break
+    else:
+        current = db.execute(select(Request.status, *(getattr(Request, f) for f in REQUIRABLE_FIELDS)).where(Request.op_id == op_id)).first()
+        if current is None:
+            return None
+        raise TransitionRejected(rejection(rule, current[0], {**current._mapping, **values}))
+    events = _insert_history(db, [{
+        "request_op_id": op_id,
+        "at": ts,
+        "department": department,
+        "from_status": from_status,
+        "to_status": to_status,
+        "comment": comment,
+    }])
+    _commit(db, events)
+    return row
+
+def planning_stmts(date_from: Optional[str] = None, date_to: Optional[str] = None):
+    # dated operations first, then undated ones; split in two so each half is
+    # read in order from ix_requests_status_planned_date without a sort step.
+    # A date range is a range scan of the same index and leaves out undated ones.
+    planned = select(Request).where(Request.status == Status.PLANNED.value)
+    dated = planned.where(Request.planned_date.is_not(None), *_date_range(Request.planned_date, date_from, date_to))
+    dated = dated.order_by(Request.planned_date.asc(), Request.updated_at.desc())
+    if date_from or date_to:
+        return (dated,)
+    return (dated, planned.where(Request.planned_date.is_(None)).order_by(Request.updated_at.desc()))
+
+def list_planning(db: Session, date_from: Optional[str] = None, date_to: Optional[str] = None) -> List[Dict[str, Any]]:
+    return [
+        dict(m) for stmt in planning_stmts(date_from, date_to)
+        for m in db.execute(stmt.with_only_columns(*REQUEST_COLUMNS)).mappings()
+    ]
+
+def _operations(db: Session, status: Status, date_col, order_by, *where) -> List[Operation]:
+    stmt = (
+        select(Request.op_id, Request.zone, Request.priority, date_col, RequestSite.site)
+        .outerjoin(RequestSite, RequestSite.request_op_id == Request.op_id)
+        .where(Request.status == status.value, *where)
+        .order_by(*order_by, RequestSite.position)
+    )
+    return group_sites(db.execute(stmt).all())
+
+def planned_operations(db: Session) -> List[Operation]:
+    """PLANNED requests with their sites, as planning.Operation tuples (undated ones included)."""
+    return _operations(db, Status.PLANNED, Request.planned_date, (Request.planned_date, Request.id))
+
+def pending_operations(db: Session, limit: int) -> List[Operation]:
+    """The `limit` oldest PENDING requests, dated by desired_date."""
+    oldest = (
+        select(Request.op_id).where(Request.status == Status.PENDING.value)
+        .order_by(Request.created_at, Request.id).limit(limit)
+    )
+    return _operations(db, Status.PENDING, Request.desired_date, (Request.created_at, Request.id), Request.op_id.in_(oldest))
+
+# stay well under SQLite's bound-parameter limit for IN (...) lists
+_IN_CHUNK = 900
+
+def _chunked(items: List[str], size: int = _IN_CHUNK):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+# a filter is a query, not a reviewed list: cap how many requests one call may move by filter
+MAX_FILTER_TARGETS = 500
+
+def batch_update_status(
+    db: Session,
+    op_ids: Optional[List[str]],
+    filters: Optional[Dict[str, Any]],
+    department: str,
+    to_status: str,
+    comment: str,
+    planned_date: Optional[str],
+) -> List[Tuple[str, Optional[str]]]:
+    """Apply one transition to many requests in a single transaction.
+
+    Targets are either explicit op_ids (any number: statements are chunked) or the
+    requests matching `filters` (status/q/site/zone). Returns (op_id, error) per
+    target, error None when applied. ValueError when a filter matches more than
+    MAX_FILTER_TARGETS requests: nothing is changed.
+    """
+    rule = rule_for(to_status, department)
+    if op_ids is not None:
+        targets = list(dict.fromkeys(op_ids))
+    else:
+        f = filters or {}
+        stmt = _filter_requests(select(Request.op_id), f.get("status"), f.get("q"), f.get("site"), f.get("zone"))
+        targets = list(db.execute(stmt.limit(MAX_FILTER_TARGETS + 1)).scalars())
+        if len(targets) > MAX_FILTER_TARGETS:
+            raise ValueError(
+                f"Filter matches more than {MAX_FILTER_TARGETS} requests; narrow it or pass the op_ids explicitly"
+            )
+
+    ts = now_iso()
+    values: Dict[str, Any] = {"status": to_status, "updated_at": ts}
+    if planned_date:
+        values["planned_date"] = planned_date
+    guard = [getattr(Request, f).is_not(None) for f in rule.required if not values.get(f)]
+    history = []
+    remaining = targets
+    for from_status in rule.sources:
+        left: List[str] = []
+        for part in _chunked(remaining):
+            # conditional per source status, as in update_status: no read, no lost update
+            updated = set(db.execute(
+                update(Request)
+                .where(Request.op_id.in_(part), Request.status == from_status, *guard)
+                .values(**values)
+                .returning(Request.op_id)
+                .execution_options(synchronize_session=False)
+            ).scalars())
+            for op_id in part:
+                if op_id in updated:
+                    history.append({
+                        "request_op_id": op_id,
+                        "at": ts,
+                        "department": department,
+                        "from_status": from_status,
+                        "to_status": to_status,
+                        "comment": comment,
+                    })
+                else:
+                    left.append(op_id)
+        remaining = left
+
+    # only the rejected targets are read, to explain why
+    errors: Dict[str, str] = {op_id: "Not found" for op_id in remaining}
+    columns = [Request.op_id, Request.status, *(getattr(Request, f) for f in REQUIRABLE_FIELDS)]
+    for part in _chunked(remaining):
+        for row in db.execute(select(*columns).where(Request.op_id.in_(part))):
+            errors[row.op_id] = rejection(rule, row.status, {**row._mapping, **values})
+    _commit(db, _insert_history(db, history))
+    return [(op_id, errors.get(op_id)) for op_id in targets]
+
+def get_stats(db: Session, since_day: str) -> Dict[str, Any]:
+    """Dashboard figures read from the trigger-maintained stat_* tables (no scan of requests/history)."""
+    counts: Dict[str, Dict[str, int]] = {d: {} for d in STAT_DIMENSIONS}
+    for dimension, key, n in db.execute(select(stat_counters).where(stat_counters.c.n > 0)):
+        counts[dimension][key] = n
+    per_day = [
+        dict(m) for m in db.execute(
+            select(stat_transitions.c.day, stat_transitions.c.department, func.sum(stat_transitions.c.n).label("count"))
+            .where(stat_transitions.c.day >= since_day)
+            .group_by(stat_transitions.c.day, stat_transitions.c.department)
+            .order_by(stat_transitions.c.day, stat_transitions.c.department)
+        ).mappings()
+    ]
+    durations = {(f, t): (n, total) for f, t, n, total in db.execute(select(stat_durations))}
+
+    def mean_hours(from_status: Status, to_status: Status) -> Optional[float]:
+        n, total = durations.get((from_status.value, to_status.value), (0, 0.0))
+        return round(total / n / 3600, 2) if n else None
 
-def list_planning(db: Session) -> List[Request]:
-    stmt = select(Request).where(Request.status == Status.PLANNED.value).order_by(Request.planned_date.is_(None), Request.planned_date.asc(), Request.updated_at.desc())
-    return list(db.execute(stmt).scalars().all())
+    to_planned = mean_hours(Status.PENDING, Status.PLANNED)
+    to_executed = mean_hours(Status.PLANNED, Status.EXECUTED)
+    executed = durations.get((Status.PLANNED.value, Status.EXECUTED.value), (0, 0.0))[0]
+    failed = durations.get((Status.PLANNED.value, Status.FAILED.value), (0, 0.0))[0]
+    return {
+        "total": sum(counts["status"].values()),
+        "by_status": counts["status"],
+        "by_zone": counts["zone"],
+        "by_priority": counts["priority"],
+        "by_feature": counts["feature"],
+        "transitions_per_day": per_day,
+        "mean_hours": {
+            "PENDING_TO_PLANNED": to_planned,
+            "PLANNED_TO_EXECUTED": to_executed,
+            "PENDING_TO_EXECUTED": None if to_planned is None or to_executed is None else round(to_planned + to_executed, 2),
+        },
+        # share of executions that failed (PLANNED -> FAILED among PLANNED -> EXECUTED|FAILED)
+        "failure_rate": round(failed / (executed + failed), 4) if executed + failed else None,
+    }
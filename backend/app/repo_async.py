@@ -0,0 +1,110 @@
+from __future__ import annotations
+from typing import Optional, List, Dict, Any, Tuple
+from sqlalchemy import Row
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import repo
+from .db import run_write_async
+from .metrics import add_rows
+from .models import Request, HistoryEntry
+from .planning import Operation
+
+# Async versions of the repo functions. Each one runs the sync implementation on
+# the AsyncSession's connection through run_sync, so queries are written once
+# and the event loop is only yielded to while the driver waits on the database.
+# Mutations are queued to the single writer thread (db.run_write_async), which
+# uses its own session: `db` is accepted for a uniform signature only.
+# Reads report the rows they return to the per-request metrics (metrics.add_rows).
+
+def _rows(rows: List[Any]) -> List[Any]:
+    add_rows(len(rows))
+    return rows
+
+def _row(row: Any) -> Any:
+    add_rows(0 if row is None else 1)
+    return row
+
+async def create_request(db: AsyncSession, payload: Dict[str, Any]) -> str:
+    return await run_write_async(repo.create_request, payload)
+
+async def bulk_create_requests(db: AsyncSession, payloads: List[Dict[str, Any]]) -> List[str]:
+    return await run_write_async(repo.bulk_create_requests, payloads)
+
+async def list_requests_page(
+    db: AsyncSession,
+    status: Optional[str],
+    q: Optional[str],
+    limit: int,
+    cursor: Optional[str] = None,
+    site: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    fields: Optional[Dict[str, str]] = None,
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    items, next_cursor = await db.run_sync(repo.list_requests_page, status, q, limit, cursor, site, date_from, date_to, fields)
+    return _rows(items), next_cursor
+
+async def count_requests(
+    db: AsyncSession,
+    status: Optional[str],
+    q: Optional[str],
+    site: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    fields: Optional[Dict[str, str]] = None,
+) -> int:
+    return await db.run_sync(repo.count_requests, status, q, site, date_from, date_to, fields)
+
+async def search_requests(db: AsyncSession, q: str, status: Optional[str], limit: int) -> List[Dict[str, Any]]:
+    return _rows(await db.run_sync(repo.search_requests, q, status, limit))
+
+async def get_request(db: AsyncSession, op_id: str) -> Optional[Request]:
+    return _row(await db.run_sync(repo.get_request, op_id))
+
+async def get_request_detail(db: AsyncSession, op_id: str) -> Optional[Request]:
+    return _row(await db.run_sync(repo.get_request_detail, op_id))
+
+async def get_request_details(db: AsyncSession, op_ids: List[str]) -> List[Request]:
+    return _rows(await db.run_sync(repo.get_request_details, op_ids))
+
+async def get_history(
+    db: AsyncSession, op_id: str, date_from: Optional[str] = None, date_to: Optional[str] = None
+) -> List[HistoryEntry]:
+    return _rows(await db.run_sync(repo.get_history, op_id, date_from, date_to))
+
+async def history_events_since(db: AsyncSession, after_id: int, limit: int) -> List[Dict[str, Any]]:
+    return _rows(await db.run_sync(repo.history_events_since, after_id, limit))
+
+async def update_status(
+    db: AsyncSession, op_id: str, department: str, to_status: str, comment: str, planned_date: Optional[str]
+) -> Optional[Row]:
+    return await run_write_async(repo.update_status, op_id, department, to_status, comment, planned_date)
+
+async def batch_update_status(
+    db: AsyncSession,
+    op_ids: Optional[List[str]],
+    filters: Optional[Dict[str, Any]],
+    department: str,
+    to_status: str,
+    comment: str,
+    planned_date: Optional[str],
+) -> List[Tuple[str, Optional[str]]]:
+    return await run_write_async(repo.batch_update_status, op_ids, filters, department, to_status, comment, planned_date)
+
+async def table_version(db: AsyncSession) -> str:
+    return await db.run_sync(repo.table_version)
+
+async def request_version(db: AsyncSession, op_id: str) -> Optional[str]:
+    return await db.run_sync(repo.request_version, op_id)
+
+async def list_planning(db: AsyncSession, date_from: Optional[str] = None, date_to: Optional[str] = None) -> List[Dict[str, Any]]:
+    return _rows(await db.run_sync(repo.list_planning, date_from, date_to))
+
+async def planned_operations(db: AsyncSession) -> List[Operation]:
+    return _rows(await db.run_sync(repo.planned_operations))
+
+async def pending_operations(db: AsyncSession, limit: int) -> List[Operation]:
+    return _rows(await db.run_sync(repo.pending_operations, limit))
+
+async def get_stats(db: AsyncSession, since_day: str) -> Dict[str, Any]:
+    return await db.run_sync(repo.get_stats, since_day)
@@ -0,0 +1,56 @@
+from __future__ import annotations
+import gzip
+import os
+from typing import Any, Dict, Optional
+
+import orjson
+from starlette.requests import Request
+from starlette.responses import Response
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+# bodies smaller than this are sent uncompressed
+COMPRESS_MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", "1024"))
+# fast levels: list payloads are repetitive JSON and compress well at low effort
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 4
+
+def make_etag(kind: str, version: str) -> str:
+    # weak: the representation may be compressed differently for the same data
+    return f'W/"{kind}-{version}"'
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    opaque = etag[2:]
+    return any(tag.strip().removeprefix("W/") == opaque for tag in header.split(","))
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+
+def json_response(request: Request, content: Any, etag: Optional[str] = None, headers: Optional[Dict[str, str]] = None) -> Response:
+    """Serialize with orjson (no per-row model instances) and compress large bodies.
+
+    Content is trusted to already match the endpoint's response_model.
+    """
+    body = orjson.dumps(content)
+    out = dict(headers or {})
+    if etag:
+        out["ETag"] = etag
+        out["Cache-Control"] = "no-cache"
+    if len(body) >= COMPRESS_MIN_SIZE:
+        accepted = request.headers.get("accept-encoding", "")
+        if brotli is not None and "br" in accepted:
+            body = brotli.compress(body, quality=BROTLI_QUALITY)
+            out["Content-Encoding"] = "br"
+        elif "gzip" in accepted:
+            body = gzip.compress(body, compresslevel=GZIP_LEVEL)
+            out["Content-Encoding"] = "gzip"
+        out["Vary"] = "Accept-Encoding"
+    return Response(body, media_type="application/json", headers=out)
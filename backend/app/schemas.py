@@ -1,17 +1,29 @@
-from pydantic import BaseModel, Field
-from typing import Optional, List
+from pydantic import BaseModel, Field, field_validator
+from typing import Dict, Optional, List, Union
+
+from .utils import normalize_date, split_sites
 
 class RequestCreate(BaseModel):
     feature: str
     parameter: str
     value: str
     zone: str
-    sites: str = Field(..., description="CSV list for demo")
+    sites: List[str] = Field(..., description="Site codes, as a list or a CSV string")
     desired_date: Optional[str] = None
     planned_date: Optional[str] = None
     priority: str = "High"
     initial_comment: Optional[str] = None
 
+    @field_validator("sites", mode="before")
+    @classmethod
+    def _split_sites(cls, v: Union[str, List[str]]) -> List[str]:
+        return split_sites(v)
+
+    @field_validator("desired_date", "planned_date")
+    @classmethod
+    def _date(cls, v: Optional[str]) -> Optional[str]:
+        return normalize_date(v)
+
 class RequestOut(BaseModel):
     op_id: str
     feature: str
@@ -19,6 +31,7 @@ class RequestOut(BaseModel):
     value: str
     zone: str
     sites: str
+    site_count: int = 0
     desired_date: Optional[str] = None
     planned_date: Optional[str] = None
     priority: str
@@ -38,15 +51,111 @@ class RequestDetailOut(BaseModel):
     request: RequestOut
     history: List[HistoryOut]
 
+class RequestBatchOut(BaseModel):
+    items: List[RequestDetailOut]
+    missing: List[str]
+
 class StatusUpdateIn(BaseModel):
     department: str
     to_status: str
     comment: str
     planned_date: Optional[str] = None
 
+    @field_validator("planned_date")
+    @classmethod
+    def _date(cls, v: Optional[str]) -> Optional[str]:
+        return normalize_date(v)
+
+class RequestFilterIn(BaseModel):
+    status: Optional[str] = None
+    q: Optional[str] = None
+    site: Optional[str] = None
+    zone: Optional[str] = None
+
+class BatchStatusUpdateIn(BaseModel):
+    op_ids: Optional[List[str]] = Field(None, description="Explicit targets; takes precedence over filter")
+    filter: Optional[RequestFilterIn] = None
+    department: str
+    to_status: str
+    comment: str
+    planned_date: Optional[str] = None
+
+    @field_validator("planned_date")
+    @classmethod
+    def _date(cls, v: Optional[str]) -> Optional[str]:
+        return normalize_date(v)
+
+class BatchStatusResultOut(BaseModel):
+    op_id: str
+    ok: bool
+    error: Optional[str] = None
+
+class BatchStatusUpdateOut(BaseModel):
+    accepted: int
+    rejected: int
+    results: List[BatchStatusResultOut]
+
 class AssistantIn(BaseModel):
     question: str
 
 class AssistantOut(BaseModel):
     answer: str
     references: List[str]
+
+class TransitionCountOut(BaseModel):
+    day: str
+    department: str
+    count: int
+
+class MeanDurationsOut(BaseModel):
+    PENDING_TO_PLANNED: Optional[float] = None
+    PLANNED_TO_EXECUTED: Optional[float] = None
+    PENDING_TO_EXECUTED: Optional[float] = None
+
+class StatsOut(BaseModel):
+    total: int
+    by_status: Dict[str, int]
+    by_zone: Dict[str, int]
+    by_priority: Dict[str, int]
+    by_feature: Dict[str, int]
+    transitions_per_day: List[TransitionCountOut]
+    mean_hours: MeanDurationsOut
+    failure_rate: Optional[float] = None
+
+class SiteConflictOut(BaseModel):
+    site: str
+    first_date: str
+    last_date: str
+    op_ids: List[str]
+
+class ZoneConflictOut(BaseModel):
+    zone: str
+    date: str
+    count: int
+    capacity: int
+    op_ids: List[str]
+
+class PlanningConflictsOut(BaseModel):
+    window_days: int
+    sites: List[SiteConflictOut]
+    zones: List[ZoneConflictOut]
+
+class SuggestionOut(BaseModel):
+    op_id: str
+    zone: str
+    priority: str
+    desired_date: Optional[str] = None
+    suggested_date: str
+
+class UnscheduledOut(BaseModel):
+    op_id: str
+    zone: str
+    priority: str
+    desired_date: Optional[str] = None
+
+class PlanningSuggestOut(BaseModel):
+    start: str
+    horizon_days: int
+    window_days: int
+    suggestions: List[SuggestionOut]
+    unscheduled: List[UnscheduledOut]
@@ -0,0 +1,78 @@
+from __future__ import annotations
+import re
+from typing import Optional
+from sqlalchemy import column, table, text
+from sqlalchemy.engine import Connection
+
+from .archive import full_history_sql
+
+# FTS5 index over requests (rowid = requests.id). "comments" concatenates the
+# history comments of the request and "sites" the request_sites codes. Triggers
+# keep requests/history in sync; sites are written once by the repo write path
+# (FTS_SET_SITES) since a trigger per site row would rewrite the FTS row n times.
+requests_fts = table("requests_fts", column("rowid"), column("requests_fts"))
+
+FTS_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS requests_fts USING fts5(
+        op_id, feature, parameter, value, zone, sites, comments,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS requests_fts_ai AFTER INSERT ON requests BEGIN
+        INSERT INTO requests_fts (rowid, op_id, feature, parameter, value, zone, sites, comments)
+        VALUES (new.id, new.op_id, new.feature, new.parameter, new.value, new.zone, '', '');
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS requests_fts_au AFTER UPDATE OF op_id, feature, parameter, value, zone ON requests BEGIN
+        UPDATE requests_fts
+        SET op_id = new.op_id, feature = new.feature, parameter = new.parameter,
+            value = new.value, zone = new.zone
+        WHERE rowid = new.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS requests_fts_ad AFTER DELETE ON requests BEGIN
+        DELETE FROM requests_fts WHERE rowid = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS history_fts_ai AFTER INSERT ON history BEGIN
+        UPDATE requests_fts
+        SET comments = comments || ' ' || coalesce(new.comment, '')
+        WHERE rowid = (SELECT id FROM requests WHERE op_id = new.request_op_id);
+    END
+    """,
+]
+
+FTS_SET_SITES = text("UPDATE requests_fts SET sites = :sites WHERE rowid = :id")
+
+# bm25 weights, in FTS column order: an op_id hit outranks a comment hit
+BM25_WEIGHTS = (10.0, 4.0, 4.0, 2.0, 2.0, 2.0, 1.0)
+
+def install_fts(conn: Connection) -> None:
+    for ddl in FTS_DDL:
+        conn.exec_driver_sql(ddl)
+
+def rebuild_fts(conn: Connection) -> None:
+    history = full_history_sql(conn)
+    conn.exec_driver_sql("DELETE FROM requests_fts")
+    conn.execute(text(f"""
+        INSERT INTO requests_fts (rowid, op_id, feature, parameter, value, zone, sites, comments)
+        SELECT r.id, r.op_id, r.feature, r.parameter, r.value, r.zone,
+               coalesce((SELECT group_concat(s.site, ' ') FROM request_sites s WHERE s.request_op_id = r.op_id), ''),
+               coalesce((SELECT group_concat(h.comment, ' ') FROM {history} h WHERE h.request_op_id = r.op_id), '')
+        FROM requests r
+    """))
+
+def build_match_query(q: Optional[str]) -> Optional[str]:
+    """Turn free user input into an FTS5 query: every term is quoted and prefix-matched."""
+    if not q:
+        return None
+    terms = re.findall(r"[\w-]+", q)
+    if not terms:
+        return None
+    return " ".join('"' + t.replace('"', '""') + '"*' for t in terms)
@@ -0,0 +1,73 @@
+from __future__ import annotations
+import os
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Optional, Tuple
+
+from .constants import ALLOWED_TRANSITIONS, Department, Status
+
+# Status transitions compiled once into a dict keyed by the target status, so the
+# update paths validate with plain string lookups (no enum construction) and
+# enforce the move with a conditional UPDATE ... WHERE status = :from per source
+# status instead of reading the row first (see repo.update_status).
+#
+# Optional rules, "<TO_STATUS>=<value>[|<value>...]" comma-separated:
+#   STATUS_DEPARTMENTS      departments allowed to move a request to a status
+#                           (e.g. "PLANNED=PILOTAGE,EXECUTED=OPERATIONS|PILOTAGE"); default any
+#   STATUS_REQUIRED_FIELDS  fields that must be set after the move, given in the
+#                           update or already on the request (e.g. "PLANNED=planned_date")
+
+DEPARTMENTS: FrozenSet[str] = frozenset(d.value for d in Department)
+REQUIRABLE_FIELDS = ("planned_date",)
+
+class TransitionRejected(ValueError):
+    pass
+
+@dataclass(frozen=True)
+class Rule:
+    to_status: str
+    # statuses the target can be reached from, in the order the UPDATEs try them
+    sources: Tuple[str, ...]
+    departments: FrozenSet[str]
+    required: Tuple[str, ...]
+
+def _parse_rules(raw: str) -> Dict[str, Tuple[str, ...]]:
+    out: Dict[str, Tuple[str, ...]] = {}
+    for part in raw.split(","):
+        key, sep, values = part.partition("=")
+        if sep and key.strip():
+            out[key.strip().upper()] = tuple(v.strip() for v in values.split("|") if v.strip())
+    return out
+
+def compile_rules(departments: str = "", required: str = "") -> Dict[str, Rule]:
+    allowed_departments = _parse_rules(departments)
+    required_fields = _parse_rules(required)
+    order = [s.value for s in Status]
+    rules: Dict[str, Rule] = {}
+    for to in Status:
+        sources = tuple(sorted((f.value for f, targets in ALLOWED_TRANSITIONS.items() if to in targets), key=order.index))
+        depts = frozenset(d.upper() for d in allowed_departments.get(to.value, ())) or DEPARTMENTS
+        fields = required_fields.get(to.value, ())
+        unknown = (depts - DEPARTMENTS) | (set(fields) - set(REQUIRABLE_FIELDS))
+        if unknown:
+            raise ValueError(f"Unknown department or field in status rules for {to.value}: {', '.join(sorted(unknown))}")
+        rules[to.value] = Rule(to.value, sources, depts, fields)
+    return rules
+
+RULES = compile_rules(os.getenv("STATUS_DEPARTMENTS", ""), os.getenv("STATUS_REQUIRED_FIELDS", ""))
+
+def rule_for(to_status: str, department: str) -> Rule:
+    """The rule for moving to `to_status`, or TransitionRejected if the status/department is invalid or not permitted."""
+    rule = RULES.get(to_status)
+    if rule is None or department not in DEPARTMENTS:
+        raise TransitionRejected("Invalid status/department")
+    if department not in rule.departments:
+        raise TransitionRejected(f"Department {department} may not move requests to {to_status}")
+    return rule
+
+def rejection(rule: Rule, current: str, fields: Dict[str, Optional[str]]) -> str:
+    """Why a conditional update matched nothing, given the row's current status and fields."""
+    if current in rule.sources:
+        missing = [f for f in rule.required if not fields.get(f)]
+        if missing:
+            return f"{', '.join(missing)} is required to move to {rule.to_status}"
+    return f"Transition not allowed: {current} -> {rule.to_status}"
@@ -0,0 +1,107 @@
+from __future__ import annotations
+from sqlalchemy import column, table
+from sqlalchemy.engine import Connection
+
+from .archive import full_history_sql
+
+# Counters behind GET /stats, maintained by triggers so every write path (single,
+# bulk and batch) keeps them exact inside its own transaction:
+#   stat_counters     live requests per status / zone / priority / feature
+#   stat_transitions  history rows per day, department and transition
+#   stat_durations    status changes per (from, to) and the total time spent in `from`
+# Rows whose count drops to 0 are kept; readers filter them out.
+stat_counters = table("stat_counters", column("dimension"), column("key"), column("n"))
+stat_transitions = table("stat_transitions", column("day"), column("department"), column("from_status"), column("to_status"), column("n"))
+stat_durations = table("stat_durations", column("from_status"), column("to_status"), column("n"), column("total_s"))
+
+STAT_DIMENSIONS = ("status", "zone", "priority", "feature")
+
+def _counter_rows(ref: str, delta: int) -> str:
+    return ", ".join(f"('{d}', {ref}.{d}, {delta})" for d in STAT_DIMENSIONS)
+
+_UPSERT_COUNTERS = "INSERT INTO stat_counters (dimension, key, n) VALUES {rows} ON CONFLICT (dimension, key) DO UPDATE SET n = n + excluded.n;"
+
+STATS_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS stat_counters (
+        dimension VARCHAR NOT NULL, key VARCHAR NOT NULL, n INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (dimension, key)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS stat_transitions (
+        day VARCHAR NOT NULL, department VARCHAR NOT NULL, from_status VARCHAR NOT NULL, to_status VARCHAR NOT NULL,
+        n INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (day, department, from_status, to_status)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS stat_durations (
+        from_status VARCHAR NOT NULL, to_status VARCHAR NOT NULL, n INTEGER NOT NULL DEFAULT 0, total_s REAL NOT NULL DEFAULT 0,
+        PRIMARY KEY (from_status, to_status)
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS stats_requests_ai AFTER INSERT ON requests BEGIN
+        {_UPSERT_COUNTERS.format(rows=_counter_rows("new", 1))}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS stats_requests_au AFTER UPDATE OF {", ".join(STAT_DIMENSIONS)} ON requests
+    WHEN {" OR ".join(f"old.{d} IS NOT new.{d}" for d in STAT_DIMENSIONS)} BEGIN
+        {_UPSERT_COUNTERS.format(rows=_counter_rows("old", -1) + ", " + _counter_rows("new", 1))}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS stats_requests_ad AFTER DELETE ON requests BEGIN
+        {_UPSERT_COUNTERS.format(rows=_counter_rows("old", -1))}
+    END
+    """,
+    # updated_at only moves on a status change, so old.updated_at is when `old.status` was entered
+    """
+    CREATE TRIGGER IF NOT EXISTS stats_requests_status_au AFTER UPDATE OF status ON requests
+    WHEN old.status IS NOT new.status BEGIN
+        INSERT INTO stat_durations (from_status, to_status, n, total_s)
+        VALUES (old.status, new.status, 1, max(0, (julianday(new.updated_at) - julianday(old.updated_at)) * 86400))
+        ON CONFLICT (from_status, to_status) DO UPDATE SET n = n + 1, total_s = total_s + excluded.total_s;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS stats_history_ai AFTER INSERT ON history BEGIN
+        INSERT INTO stat_transitions (day, department, from_status, to_status, n)
+        VALUES (substr(new.at, 1, 10), new.department, coalesce(new.from_status, ''), new.to_status, 1)
+        ON CONFLICT (day, department, from_status, to_status) DO UPDATE SET n = n + 1;
+    END
+    """,
+]
+
+def install_stats(conn: Connection) -> None:
+    for ddl in STATS_DDL:
+        conn.exec_driver_sql(ddl)
+
+def rebuild_stats(conn: Connection) -> None:
+    """Recompute every counter from requests and history, archived history included (backfill / repair)."""
+    history = full_history_sql(conn)
+    for name in ("stat_counters", "stat_transitions", "stat_durations"):
+        conn.exec_driver_sql(f"DELETE FROM {name}")
+    for d in STAT_DIMENSIONS:
+        conn.exec_driver_sql(
+            f"INSERT INTO stat_counters (dimension, key, n) SELECT '{d}', {d}, count(*) FROM requests GROUP BY {d}"
+        )
+    conn.exec_driver_sql(f"""
+        INSERT INTO stat_transitions (day, department, from_status, to_status, n)
+        SELECT substr(at, 1, 10), department, coalesce(from_status, ''), to_status, count(*)
+        FROM {history} GROUP BY 1, 2, 3, 4
+    """)
+    # time in a status = gap between the history entry that entered it and the one that left it
+    conn.exec_driver_sql(f"""
+        INSERT INTO stat_durations (from_status, to_status, n, total_s)
+        SELECT from_status, to_status, count(*), sum(max(0, (julianday(at) - julianday(prev_at)) * 86400))
+        FROM (
+            SELECT from_status, to_status, at,
+                   lag(at) OVER (PARTITION BY request_op_id ORDER BY at, id) AS prev_at
+            FROM {history}
+        )
+        WHERE from_status IS NOT NULL AND prev_at IS NOT NULL
+        GROUP BY from_status, to_status
+    """)
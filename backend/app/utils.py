@@ -1,4 +1,70 @@
-from datetime import datetime
+import re
+from datetime import date, datetime, timedelta, timezone
+from typing import Iterable, List, Optional, Tuple, Union
+
+# Canonical stored forms (see models.ISODate / ISOTimestamp): fixed width, so
+# string order is chronological and range predicates can use the indexes.
+DATE_FORMAT = "%Y-%m-%d"
+TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+DATE_GLOB = "[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]"
+TIMESTAMP_GLOB = DATE_GLOB + "T[0-9][0-9]:[0-9][0-9]:[0-9][0-9]Z"
+_CANONICAL_DATE = re.compile(r"\d{4}-\d{2}-\d{2}")
+_CANONICAL_TIMESTAMP = re.compile(r"\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}Z")
+_FRENCH_DATE = re.compile(r"(\d{1,2})/(\d{1,2})/(\d{4})")
 
 def now_iso() -> str:
     return datetime.utcnow().replace(microsecond=0).isoformat() + "Z"
+
+def days_ago_iso(days: int) -> str:
+    """UTC date `days` days before today, as YYYY-MM-DD."""
+    return (datetime.utcnow().date() - timedelta(days=days)).isoformat()
+
+def _to_datetime(value: Union[str, date]) -> datetime:
+    if isinstance(value, datetime):
+        dt = value
+    elif isinstance(value, date):
+        dt = datetime(value.year, value.month, value.day)
+    else:
+        raw = value.strip()
+        m = _FRENCH_DATE.fullmatch(raw)
+        if m:
+            raw = f"{m.group(3)}-{int(m.group(2)):02d}-{int(m.group(1)):02d}"
+        dt = datetime.fromisoformat(raw[:-1] + "+00:00" if raw.endswith("Z") else raw)
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
+def normalize_date(value: Union[str, date, None]) -> Optional[str]:
+    """YYYY-MM-DD from a date, an ISO date/timestamp or DD/MM/YYYY; None for empty, ValueError if invalid."""
+    if value is None or (isinstance(value, str) and not value.strip()):
+        return None
+    if isinstance(value, str) and _CANONICAL_DATE.fullmatch(value):
+        date.fromisoformat(value)
+        return value
+    return _to_datetime(value).strftime(DATE_FORMAT)
+
+def normalize_timestamp(value: Union[str, date, None]) -> Optional[str]:
+    """YYYY-MM-DDTHH:MM:SSZ in UTC (naive values are taken as UTC); None for empty, ValueError if invalid."""
+    if value is None or (isinstance(value, str) and not value.strip()):
+        return None
+    if isinstance(value, str) and _CANONICAL_TIMESTAMP.fullmatch(value):
+        return value
+    return _to_datetime(value).replace(microsecond=0).strftime(TIMESTAMP_FORMAT)
+
+def iso_week(today: Optional[date] = None) -> Tuple[str, str]:
+    """Monday and Sunday of the ISO week containing `today` (default: current UTC date)."""
+    today = today or datetime.utcnow().date()
+    monday = today - timedelta(days=today.weekday())
+    return monday.isoformat(), (monday + timedelta(days=6)).isoformat()
+
+def split_sites(raw: Union[str, Iterable[str], None]) -> List[str]:
+    """Normalize a CSV string or a list of site codes into unique, ordered codes."""
+    if raw is None:
+        return []
+    parts = re.split(r"[,;\s]+", raw) if isinstance(raw, str) else raw
+    seen = {}
+    for p in parts:
+        code = str(p).strip()
+        if code and code not in seen:
+            seen[code] = None
+    return list(seen)
@@ -0,0 +1,171 @@
+"""Fill a database with synthetic, reproducible network operations.
+
+    cd backend
+    python -m bench.generate_data --requests 50000 --sites 1-6 --max-transitions 4 --seed 1
+    python -m bench.generate_data --db /tmp/big.db --requests 1000000 --days 730
+
+Each request starts PENDING and walks ALLOWED_TRANSITIONS (PENDING -> PLANNED ->
+EXECUTED | FAILED, FAILED -> PLANNED ...) with one history entry per step, at
+increasing timestamps spread over the last --days days. The FTS index, stats
+counters and op_id sequences are rebuilt at the end, like after a migration.
+"""
+from __future__ import annotations
+import argparse
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import insert, text
+from sqlalchemy.engine import Engine
+
+from app.constants import ALLOWED_TRANSITIONS, Department, Status
+from app.models import Base, HistoryEntry, Request, RequestSite
+from app.search import rebuild_fts
+from app.stats import rebuild_stats
+
+FEATURES = [
+    ("5G – Power Optimization", "TX_POWER", ["20", "23", "26", "30"]),
+    ("4G – Load Balancing", "MLB_THRESHOLD", ["60", "70", "80"]),
+    ("5G – Carrier Aggregation", "CA_ENABLED", ["true", "false"]),
+    ("Mobility – Handover", "A3_OFFSET", ["1", "2", "3", "4"]),
+    ("Energy Saving – Cell Sleep", "SLEEP_WINDOW", ["00:00-05:00", "01:00-06:00"]),
+    ("VoLTE – Codec", "AMR_WB_MODE", ["2", "8"]),
+]
+ZONES = ["Paris", "Lyon", "Marseille", "Lille", "Bordeaux", "Toulouse", "Nantes", "Nice", "Strasbourg", "Rennes"]
+PRIORITIES = (["High"] * 2) + (["Medium"] * 5) + (["Low"] * 3)
+# who performs each kind of transition
+DEPARTMENT_FOR = {
+    Status.PLANNED: Department.PILOTAGE,
+    Status.EXECUTED: Department.OPERATIONS,
+    Status.FAILED: Department.OPERATIONS,
+}
+COMMENTS = {
+    Status.PLANNED: ["Planifiée sur la fenêtre de nuit.", "Créneau validé avec l'exploitation.", "Replanifiée après analyse."],
+    Status.EXECUTED: ["Exécutée sans incident.", "Paramètre appliqué, KPI stables.", "OK."],
+    Status.FAILED: ["Échec: rollback effectué.", "Site injoignable, à replanifier.", "Dégradation KPI, retour arrière."],
+}
+FMT = "%Y-%m-%dT%H:%M:%SZ"
+
+def _parse_range(raw: str) -> Tuple[int, int]:
+    lo, _, hi = raw.partition("-")
+    return int(lo), int(hi or lo)
+
+def _walk(rng: random.Random, created: datetime, now: datetime, max_transitions: int, advance: float) -> List[Tuple[Optional[Status], Status, datetime]]:
+    """(from, to, at) steps of one request's life, creation included."""
+    steps: List[Tuple[Optional[Status], Status, datetime]] = [(None, Status.PENDING, created)]
+    status, at = Status.PENDING, created
+    for _ in range(max_transitions):
+        allowed = sorted(ALLOWED_TRANSITIONS[status], key=lambda s: s.value)
+        if not allowed or rng.random() > advance:
+            break
+        # executions succeed most of the time
+        weights = [0.15 if s == Status.FAILED else 1.0 for s in allowed]
+        nxt = rng.choices(allowed, weights)[0]
+        at = at + timedelta(hours=rng.uniform(2, 24 * 10))
+        if at > now:
+            break
+        steps.append((status, nxt, at))
+        status = nxt
+    return steps
+
+def generate(
+    engine: Engine,
+    requests: int,
+    sites: Tuple[int, int] = (1, 6),
+    max_transitions: int = 4,
+    advance: float = 0.75,
+    days: int = 365,
+    seed: int = 1,
+    batch: int = 5000,
+) -> Dict[str, Any]:
+    """Append `requests` synthetic requests (with sites and history) to the database behind `engine`."""
+    rng = random.Random(seed)
+    now = datetime.utcnow().replace(microsecond=0)
+    site_pool = {zone: [f"{zone[:3].upper()}{n:04d}" for n in range(1, 401)] for zone in ZONES}
+    counters: Dict[int, int] = {}
+    totals = {"requests": 0, "sites": 0, "history": 0}
+    with engine.begin() as conn:
+        for year, last in conn.execute(text("SELECT year, last_value FROM op_sequences")):
+            counters[year] = last
+
+    for start in range(0, requests, batch):
+        req_rows, site_rows, hist_rows = [], [], []
+        for _ in range(min(batch, requests - start)):
+            created = now - timedelta(seconds=rng.randint(0, days * 86400))
+            counters[created.year] = counters.get(created.year, 0) + 1
+            op_id = f"OP-{created.year}-{counters[created.year]:04d}"
+            feature, parameter, values = rng.choice(FEATURES)
+            zone = rng.choice(ZONES)
+            steps = _walk(rng, created, now, max_transitions, advance)
+            status, last_at = steps[-1][1], steps[-1][2]
+            planned = None
+            if any(to == Status.PLANNED for _, to, _ in steps):
+                planned_at = max(at for _, to, at in steps if to == Status.PLANNED) + timedelta(days=rng.randint(1, 14))
+                planned = planned_at.strftime("%Y-%m-%d")
+            req_rows.append({
+                "op_id": op_id, "feature": feature, "parameter": parameter, "value": rng.choice(values),
+                "zone": zone, "legacy_sites": "", "desired_date": (created + timedelta(days=rng.randint(3, 30))).strftime("%Y-%m-%d"),
+                "planned_date": planned, "priority": rng.choice(PRIORITIES), "initial_comment": None,
+                "status": status.value, "created_at": created.strftime(FMT), "updated_at": last_at.strftime(FMT),
+            })
+            codes = rng.sample(site_pool[zone], rng.randint(*sites))
+            site_rows += [{"request_op_id": op_id, "position": i, "site": code} for i, code in enumerate(codes)]
+            for from_status, to_status, at in steps:
+                hist_rows.append({
+                    "request_op_id": op_id, "at": at.strftime(FMT),
+                    "department": (DEPARTMENT_FOR.get(to_status, Department.ENGINEERING)).value,
+                    "from_status": from_status.value if from_status else None, "to_status": to_status.value,
+                    "comment": rng.choice(COMMENTS[to_status]) if from_status else "Création de la demande.",
+                })
+        with engine.begin() as conn:
+            conn.execute(insert(Request), req_rows)
+            if site_rows:
+                conn.execute(insert(RequestSite), site_rows)
+            conn.execute(insert(HistoryEntry), hist_rows)
+        totals["requests"] += len(req_rows)
+        totals["sites"] += len(site_rows)
+        totals["history"] += len(hist_rows)
+
+    with engine.begin() as conn:
+        conn.execute(
+            text("INSERT INTO op_sequences (year, last_value) VALUES (:year, :n) "
+                 "ON CONFLICT (year) DO UPDATE SET last_value = max(op_sequences.last_value, excluded.last_value)"),
+            [{"year": y, "n": n} for y, n in counters.items()],
+        )
+        rebuild_fts(conn)
+        rebuild_stats(conn)
+    return totals
+
+def main(argv: List[str]) -> int:
+    from app.db import get_db_path, get_engine
+    from app.migrations import upgrade
+
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--db", default=get_db_path(), help="SQLite file to fill (default: DB_PATH)")
+    ap.add_argument("--requests", type=int, default=10000)
+    ap.add_argument("--sites", type=_parse_range, default=(1, 6), help="sites per request, e.g. 1-6")
+    ap.add_argument("--max-transitions", type=int, default=4, help="status changes per request at most")
+    ap.add_argument("--advance", type=float, default=0.75, help="probability of each further status change")
+    ap.add_argument("--days", type=int, default=365, help="spread creation dates over this many past days")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--append", action="store_true", help="add to a database that already has requests")
+    args = ap.parse_args(argv)
+
+    engine = get_engine(f"sqlite:///{args.db}")
+    Base.metadata.create_all(bind=engine)
+    upgrade(engine)
+    with engine.connect() as conn:
+        existing = conn.execute(text("SELECT count(*) FROM requests")).scalar_one()
+    if existing and not args.append:
+        print(f"{args.db} already has {existing} requests; pass --append to add more", file=sys.stderr)
+        return 1
+    t0 = time.perf_counter()
+    totals = generate(engine, args.requests, args.sites, args.max_transitions, args.advance, args.days, args.seed)
+    print(f"{args.db}: {totals['requests']} requests, {totals['sites']} sites, {totals['history']} history entries "
+          f"in {time.perf_counter() - t0:.1f}s")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
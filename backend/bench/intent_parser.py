@@ -0,0 +1,110 @@
+"""Accuracy and latency of the assistant's intent parsers on a labeled question set.
+
+    cd backend
+    python -m bench.intent_parser                 # local parser only
+    python -m bench.intent_parser --llm           # also the LLM parser (needs OPENAI_API_KEY)
+    python -m bench.intent_parser --out intent.json
+
+Questions live in bench/intent_questions.jsonl ({question, intent, op_id}).
+The local parser resolves op_ids against a fresh database holding OP-YYYY-0001..N.
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+from typing import Any, Dict, List
+
+from sqlalchemy import insert
+from sqlalchemy.orm import sessionmaker
+
+from app.db import get_engine
+from app.intent import parse
+from app.models import Base, Request
+from app.repo import existing_op_ids
+
+QUESTIONS = os.path.join(os.path.dirname(__file__), "intent_questions.jsonl")
+
+def _percentile(values: List[float], p: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+def _summary(name: str, cases: List[Dict[str, Any]], results: List[Dict[str, Any]], latencies: List[float]) -> Dict[str, Any]:
+    correct = [r["intent"] == c["intent"] and r["op_id"] == c["op_id"] for c, r in zip(cases, results)]
+    return {
+        "parser": name,
+        "questions": len(cases),
+        "accuracy": round(sum(correct) / len(cases), 3),
+        "p50_ms": round(_percentile(latencies, 50) * 1000, 3),
+        "p99_ms": round(_percentile(latencies, 99) * 1000, 3),
+        "misses": [
+            {"question": c["question"], "expected": [c["intent"], c["op_id"]], "got": [r["intent"], r["op_id"]]}
+            for c, r, ok in zip(cases, results, correct) if not ok
+        ],
+    }
+
+def run_local(cases: List[Dict[str, Any]], year: int, known: int, repeat: int) -> Dict[str, Any]:
+    engine = get_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'intent.db')}")
+    Base.metadata.create_all(bind=engine)
+    ts = "2026-01-01T00:00:00Z"
+    with engine.begin() as conn:
+        conn.execute(insert(Request), [
+            {"op_id": f"OP-{year}-{n:04d}", "feature": "f", "parameter": "p", "value": "v", "zone": "z",
+             "priority": "High", "status": "PENDING", "created_at": ts, "updated_at": ts}
+            for n in range(1, known + 1)
+        ])
+    Session = sessionmaker(bind=engine)
+    results, latencies = [], []
+    with Session() as db:
+        existing = lambda ids: existing_op_ids(db, ids)
+        for c in cases:
+            for _ in range(repeat):
+                t0 = time.perf_counter()
+                r = parse(c["question"], existing)
+                latencies.append(time.perf_counter() - t0)
+            results.append({"intent": r.intent, "op_id": r.op_id, "confidence": r.confidence})
+    engine.dispose()
+    return _summary("local", cases, results, latencies)
+
+async def run_llm(cases: List[Dict[str, Any]], year: int, known: int) -> Dict[str, Any]:
+    from openai import AsyncOpenAI
+    from app.assistant import _llm_parse_intent
+
+    client = AsyncOpenAI(api_key=os.environ["OPENAI_API_KEY"])
+    known_ids = [f"OP-{year}-{n:04d}" for n in range(known, 0, -1)][:200]
+    results, latencies = [], []
+    for c in cases:
+        t0 = time.perf_counter()
+        r = await _llm_parse_intent(client, c["question"], known_ids)
+        latencies.append(time.perf_counter() - t0)
+        results.append(r)
+    return _summary("llm", cases, results, latencies)
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--llm", action="store_true", help="also measure the LLM parser")
+    ap.add_argument("--year", type=int, default=2026)
+    ap.add_argument("--known", type=int, default=50, help="op_ids present in the database")
+    ap.add_argument("--repeat", type=int, default=20, help="local runs per question (latency samples)")
+    ap.add_argument("--out", help="write results as JSON to this file")
+    args = ap.parse_args()
+
+    with open(QUESTIONS, encoding="utf-8") as f:
+        cases = [json.loads(line) for line in f if line.strip()]
+    summaries = [run_local(cases, args.year, args.known, args.repeat)]
+    if args.llm:
+        summaries.append(asyncio.run(run_llm(cases, args.year, args.known)))
+
+    for s in summaries:
+        print(f"{s['parser']:>6}: accuracy {s['accuracy']:.1%} on {s['questions']} questions, "
+              f"p50 {s['p50_ms']} ms, p99 {s['p99_ms']} ms")
+        for miss in s["misses"]:
+            print(f"        miss: {miss['question']!r} expected {miss['expected']} got {miss['got']}")
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(summaries, f, indent=2, ensure_ascii=False)
+
+if __name__ == "__main__":
+    main()
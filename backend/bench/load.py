@@ -0,0 +1,159 @@
+"""Latency and throughput of the main endpoints, in process through the ASGI app.
+
+    cd backend
+    python -m bench.load --requests 20000 --calls 500 --concurrency 16 --out load.json
+    python -m bench.load --db data/app.db --out after.json --baseline load.json
+
+The database is either generated (bench.generate_data, fixed --seed) or copied
+from --db, so runs never modify the source and status updates always find
+PENDING requests to plan. The assistant runs in safe mode (OPENAI_API_KEY unset,
+local intent parser only). Every scenario reports throughput and p50/p95/p99.
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List
+
+SCENARIOS = ("list", "detail", "planning", "status", "assistant")
+
+def _percentile(sorted_ms: List[float], p: float) -> float:
+    if not sorted_ms:
+        return 0.0
+    return sorted_ms[min(len(sorted_ms) - 1, int(round(p / 100 * (len(sorted_ms) - 1))))]
+
+def _prepare_db(args: argparse.Namespace, path: str) -> None:
+    if args.db:
+        shutil.copyfile(args.db, path)
+        archive = os.path.splitext(args.db)[0] + ".archive.db"
+        if os.path.exists(archive):
+            shutil.copyfile(archive, os.environ["ARCHIVE_DB_PATH"])
+        return
+    from app.db import get_engine
+    from app.migrations import upgrade
+    from app.models import Base
+    from bench.generate_data import generate
+
+    engine = get_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    upgrade(engine)
+    generate(engine, args.requests, seed=args.seed)
+    engine.dispose()
+
+async def _run(name: str, calls: int, concurrency: int, call: Callable[[int], Any]) -> Dict[str, Any]:
+    latencies: List[float] = []
+    errors = 0
+    next_i = 0
+
+    async def worker():
+        nonlocal errors, next_i
+        while next_i < calls:
+            i, next_i = next_i, next_i + 1
+            t0 = time.perf_counter()
+            resp = await call(i)
+            latencies.append((time.perf_counter() - t0) * 1000)
+            if resp.status_code >= 400:
+                errors += 1
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - t0
+    latencies.sort()
+    return {
+        "scenario": name, "calls": len(latencies), "errors": errors, "seconds": round(elapsed, 3),
+        "rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(_percentile(latencies, 50), 2), "p95_ms": round(_percentile(latencies, 95), 2),
+        "p99_ms": round(_percentile(latencies, 99), 2),
+    }
+
+async def run(calls: int, concurrency: int, seed: int, scenarios: List[str]) -> List[Dict[str, Any]]:
+    import httpx
+    from sqlalchemy import text
+
+    from app.db import engine, shutdown
+    from app.main import app
+
+    rng = random.Random(seed)
+    with engine.connect() as conn:
+        op_ids = [r[0] for r in conn.execute(text("SELECT op_id FROM requests"))]
+        pending = [r[0] for r in conn.execute(text("SELECT op_id FROM requests WHERE status = 'PENDING'"))]
+    if not op_ids:
+        raise SystemExit("database has no requests; generate some with bench.generate_data")
+    picks = [rng.choice(op_ids) for _ in range(calls)]
+    rng.shuffle(pending)
+    questions = ["Quel est le statut de {}?", "historique de {}", "qui a planifié {} ?", "{} c'est fait ?"]
+    asked = [rng.choice(questions).format(op_id) for op_id in picks]
+
+    results = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        plans = {
+            "list": lambda i: client.get("/requests", params={"limit": 50}),
+            "detail": lambda i: client.get(f"/requests/{picks[i]}"),
+            "planning": lambda i: client.get("/planning"),
+            "status": lambda i: client.post(f"/requests/{pending[i]}/status", json={
+                "department": "PILOTAGE", "to_status": "PLANNED", "comment": "bench", "planned_date": "2026-01-01"}),
+            "assistant": lambda i: client.post("/assistant", json={"question": asked[i]}),
+        }
+        for name in scenarios:
+            # each status call plans a distinct PENDING request
+            n = min(calls, len(pending)) if name == "status" else calls
+            results.append(await _run(name, n, concurrency, plans[name]))
+    # ASGITransport does not run the app's lifespan
+    await shutdown()
+    return results
+
+def _compare(results: List[Dict[str, Any]], baseline: List[Dict[str, Any]]) -> None:
+    before = {r["scenario"]: r for r in baseline}
+    print(f"{'scenario':<10} {'rps':>10} {'Δ':>8} {'p95 ms':>10} {'Δ':>8} {'p99 ms':>10} {'Δ':>8}")
+    for r in results:
+        b = before.get(r["scenario"])
+
+        def delta(key: str) -> str:
+            return f"{(r[key] - b[key]) / b[key] * 100:+.0f}%" if b and b[key] else "n/a"
+
+        print(f"{r['scenario']:<10} {r['rps']:>10} {delta('rps'):>8} {r['p95_ms']:>10} {delta('p95_ms'):>8} {r['p99_ms']:>10} {delta('p99_ms'):>8}")
+
+def main(argv: List[str]) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--db", help="copy this database instead of generating one")
+    ap.add_argument("--requests", type=int, default=10000, help="requests to generate when --db is not given")
+    ap.add_argument("--calls", type=int, default=500, help="calls per scenario")
+    ap.add_argument("--concurrency", type=int, default=16)
+    ap.add_argument("--scenarios", default=",".join(SCENARIOS), help="comma-separated subset of " + ", ".join(SCENARIOS))
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--out", help="write the results as JSON")
+    ap.add_argument("--baseline", help="JSON from a previous --out to compare against")
+    args = ap.parse_args(argv)
+    scenarios = [s for s in args.scenarios.split(",") if s]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        ap.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    # app.db builds its engines from the environment at import time
+    path = os.path.join(tempfile.mkdtemp(), "load.db")
+    os.environ["DB_PATH"] = path
+    os.environ["ARCHIVE_DB_PATH"] = os.path.join(os.path.dirname(path), "load.archive.db")
+    os.environ.pop("OPENAI_API_KEY", None)
+    _prepare_db(args, path)
+    results = asyncio.run(run(args.calls, args.concurrency, args.seed, scenarios))
+
+    report: Dict[str, Any] = {"calls": args.calls, "concurrency": args.concurrency, "db": args.db or f"generated:{args.requests}", "results": results}
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            _compare(results, json.load(f)["results"])
+    else:
+        print(json.dumps(report, indent=2))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,108 @@
+"""Read throughput while writes are happening, per SQLite engine profile.
+
+    cd backend
+    python -m bench.sqlite_concurrency --seconds 10 --readers 8 --seed-rows 5000
+
+Each profile gets a fresh database. One writer thread (like the app's single
+writer) creates requests and moves them through statuses while reader threads
+page through GET /requests-style keyset queries.
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Any, Dict
+
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from app.db import SQLITE_PROFILES, get_engine
+from app.migrations import upgrade
+from app.models import Base
+from app.repo import bulk_create_requests, create_request, list_requests_page, update_status
+
+def _payload(i: int) -> Dict[str, Any]:
+    return {"feature": "5G – Power Optimization", "parameter": "TX_POWER", "value": str(i % 40),
+            "zone": f"Z{i % 12}", "sites": [f"S{i % 500}", f"S{(i + 7) % 500}"], "priority": "High"}
+
+def run_profile(profile: str, seconds: float, readers: int, seed_rows: int) -> Dict[str, Any]:
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    engine = get_engine(f"sqlite:///{path}", profile=profile)
+    Base.metadata.create_all(bind=engine)
+    upgrade(engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+    with Session() as db:
+        for start in range(0, seed_rows, 1000):
+            bulk_create_requests(db, [_payload(i) for i in range(start, min(start + 1000, seed_rows))])
+
+    stop = threading.Event()
+    counts = {"reads": 0, "read_errors": 0, "writes": 0, "write_errors": 0}
+    lock = threading.Lock()
+
+    def writer():
+        i = 0
+        while not stop.is_set():
+            try:
+                with Session() as db:
+                    op_id = create_request(db, _payload(i))
+                    update_status(db, op_id, "PILOTAGE", "PLANNED", "bench", "2026-01-01")
+                n, key = 2, "writes"
+            except OperationalError:
+                n, key = 1, "write_errors"
+            with lock:
+                counts[key] += n
+            i += 1
+
+    def reader():
+        local = errors = 0
+        while not stop.is_set():
+            try:
+                with Session() as db:
+                    list_requests_page(db, status="ALL", q=None, limit=50)
+                local += 1
+            except OperationalError:
+                errors += 1
+        with lock:
+            counts["reads"] += local
+            counts["read_errors"] += errors
+
+    threads = [threading.Thread(target=writer)] + [threading.Thread(target=reader) for _ in range(readers)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+    engine.dispose()
+    return {
+        "profile": profile,
+        "seconds": round(elapsed, 2),
+        "reads_per_s": round(counts["reads"] / elapsed, 1),
+        "writes_per_s": round(counts["writes"] / elapsed, 1),
+        **counts,
+    }
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--seconds", type=float, default=10)
+    ap.add_argument("--readers", type=int, default=8)
+    ap.add_argument("--seed-rows", type=int, default=5000)
+    ap.add_argument("--profiles", nargs="+", default=list(SQLITE_PROFILES))
+    ap.add_argument("--out", help="write results as JSON to this file")
+    args = ap.parse_args()
+
+    results = [run_profile(p, args.seconds, args.readers, args.seed_rows) for p in args.profiles]
+    for r in results:
+        print(f"{r['profile']:>10}: {r['reads_per_s']:>8} reads/s  {r['writes_per_s']:>7} writes/s  "
+              f"read errors {r['read_errors']}  write errors {r['write_errors']}")
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,6 @@
+import os
+import tempfile
+
+# app.db builds its engines from the environment at import time; keep them off data/app.db
+os.environ.setdefault("DB_PATH", os.path.join(tempfile.mkdtemp(), "app.db"))
+os.environ.pop("OPENAI_API_KEY", None)
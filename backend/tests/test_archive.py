@@ -0,0 +1,32 @@
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app import repo
+from app.archive import has_archive
+from app.migrations import upgrade
+from app.models import Base
+from app.search import rebuild_fts
+from app.stats import rebuild_stats
+
+PAYLOAD = {"feature": "f", "parameter": "p", "value": "v", "zone": "Paris", "priority": "High", "sites": ["S1"]}
+
+def test_reads_without_an_attached_archive(tmp_path):
+    # a plain engine: none of app.db's connect hooks, so no "archive" schema
+    engine = create_engine(f"sqlite:///{tmp_path / 'plain.db'}")
+    try:
+        Base.metadata.create_all(bind=engine)
+        upgrade(engine)
+        assert not has_archive(engine)
+        with Session(engine) as db:
+            op_id = repo.create_request(db, PAYLOAD)
+            assert [h.to_status for h in repo.get_history(db, op_id)] == ["PENDING"]
+            assert repo.get_request_detail(db, op_id).op_id == op_id
+            assert [r.op_id for r in repo.get_request_details(db, [op_id])] == [op_id]
+            stmts = repo.export_history_stmts("ALL", None, None, None, archived=has_archive(engine))
+            assert len(stmts) == 1
+            assert len(db.execute(stmts[0]).all()) == 1
+        with engine.begin() as conn:
+            rebuild_fts(conn)
+            rebuild_stats(conn)
+    finally:
+        engine.dispose()
@@ -0,0 +1,34 @@
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+from app import repo
+from app.migrations import upgrade
+from app.models import Base
+from app.planning import find_conflicts
+from app.utils import now_iso
+
+PAYLOAD = {"feature": "f", "parameter": "p", "value": "v", "zone": "Paris", "priority": "High", "sites": ["S1"]}
+
+def test_order_holds_past_op_id_9999(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'ids.db'}")
+    try:
+        Base.metadata.create_all(bind=engine)
+        upgrade(engine)
+        year = int(now_iso()[:4])
+        with engine.begin() as conn:
+            conn.execute(text("INSERT INTO op_sequences (year, last_value) VALUES (:year, 9998)"), {"year": year})
+        with Session(engine) as db:
+            ids = repo.bulk_create_requests(db, [PAYLOAD, PAYLOAD])
+            assert ids == [f"OP-{year}-9999", f"OP-{year}-10000"]
+            # same creation second and planned day: only the tie-breaker orders them
+            db.execute(text("UPDATE requests SET created_at = '2026-01-01T00:00:00Z'"))
+            db.commit()
+            assert [op[0] for op in repo.pending_operations(db, 10)] == ids
+            assert [op[0] for op in repo.pending_operations(db, 1)] == ids[:1]
+            db.execute(text("UPDATE requests SET status = 'PLANNED', planned_date = '2026-02-01'"))
+            db.commit()
+            planned = repo.planned_operations(db)
+            assert [op[0] for op in planned] == ids
+            assert find_conflicts(planned)["sites"][0]["op_ids"] == ids
+    finally:
+        engine.dispose()
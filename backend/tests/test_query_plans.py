@@ -0,0 +1,17 @@
+from sqlalchemy import inspect
+
+from app.db import get_engine
+from app.migrations import upgrade
+from app.models import Base
+from app.query_plans import check_query_plans
+
+def test_hot_queries_use_their_indexes(tmp_path):
+    engine = get_engine(f"sqlite:///{tmp_path / 'plans.db'}")
+    try:
+        Base.metadata.create_all(bind=engine)
+        upgrade(engine)
+        assert check_query_plans(engine) == []
+        # covered by ix_history_request_op_id_at
+        assert "ix_history_request_op_id" not in {ix["name"] for ix in inspect(engine).get_indexes("history")}
+    finally:
+        engine.dispose()
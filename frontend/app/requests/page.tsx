@@ -1,7 +1,7 @@
 "use client";
 
 import React from "react";
-import useSWR from "swr";
+import useSWRInfinite from "swr/infinite";
 import {
   Badge,
   Box,
@@ -27,7 +27,7 @@ import {
   SimpleGrid,
 } from "@chakra-ui/react";
 import { Eye, Pencil, Plus, Filter, RotateCcw } from "lucide-react";
-import { fetcher } from "@/lib/api";
+import { pageFetcher, type Page } from "@/lib/api";
 import type { Priority, RequestItem, StatusCode } from "@/lib/types";
 import { statusColorScheme, statusLabel } from "@/lib/labels";
 
@@ -54,12 +54,37 @@ type Filters = {
 
 const defaultFilters: Filters = { feature: "ALL", parameter: "ALL", priority: "ALL", status: "ALL" };
 
-export default function RequestsPage() {
-  const { data, mutate } = useSWR<RequestItem[]>(`/api/requests`, fetcher);
+// /requests is filtered server-side and cursor-paginated (200 per page): the filters are part
+// of every page key, so changing one starts over from the first page, and each page's
+// X-Next-Cursor keys the next one
+function pageKeys(filters: Filters) {
+  const params = new URLSearchParams();
+  for (const [name, value] of Object.entries(filters)) {
+    if (value !== "ALL") params.set(name, value);
+  }
+  return (index: number, previous: Page<RequestItem> | null) => {
+    const page = new URLSearchParams(params);
+    if (index > 0) {
+      if (!previous?.nextCursor) return null;
+      page.set("cursor", previous.nextCursor);
+    }
+    const query = page.toString();
+    return query ? `/api/requests?${query}` : `/api/requests`;
+  };
+}
 
+export default function RequestsPage() {
   const [draft, setDraft] = React.useState<Filters>(defaultFilters);
   const [applied, setApplied] = React.useState<Filters>(defaultFilters);
 
+  const { data: pages, mutate, size, setSize, isValidating } = useSWRInfinite<Page<RequestItem>>(
+    React.useMemo(() => pageKeys(applied), [applied]),
+    pageFetcher<RequestItem>,
+  );
+  const rows = React.useMemo(() => pages?.flatMap((p) => p.items) ?? [], [pages]);
+  const total = pages?.[0]?.total ?? null;
+  const hasMore = Boolean(pages?.[pages.length - 1]?.nextCursor);
+
   const createModal = useDisclosure();
   const viewModal = useDisclosure();
   const editModal = useDisclosure();
@@ -78,17 +103,6 @@ export default function RequestsPage() {
     }
   }, [draft.feature]);
 
-  const rows = React.useMemo(() => {
-    const items = data ?? [];
-    return items.filter((r) => {
-      if (applied.feature !== "ALL" && r.feature !== applied.feature) return false;
-      if (applied.parameter !== "ALL" && r.parameter !== applied.parameter) return false;
-      if (applied.priority !== "ALL" && r.priority !== applied.priority) return false;
-      if (applied.status !== "ALL" && r.status !== applied.status) return false;
-      return true;
-    });
-  }, [data, applied]);
-
   return (
     <VStack align="stretch" spacing={4}>
       <Flex align="center">
@@ -177,7 +191,8 @@ export default function RequestsPage() {
 
 
           <Box mt={3} fontSize="sm" color="gray.600">
-            Résultats: <b>{rows.length}</b>
+            Résultats: <b>{total ?? rows.length}</b>
+            {hasMore && <> ({rows.length} chargées)</>}
           </Box>
         </CardBody>
       </Card>
@@ -250,6 +265,13 @@ export default function RequestsPage() {
               </Tbody>
             </Table>
           </Box>
+          {hasMore && (
+            <Flex mt={4} justify="center">
+              <Button variant="outline" isLoading={isValidating} onClick={() => setSize(size + 1)}>
+                Charger plus
+              </Button>
+            </Flex>
+          )}
         </CardBody>
       </Card>
 
@@ -113,7 +113,6 @@ export default function EditRequestModal({
       });
 
       await mutate(`/api/requests/${opId}`);
-      await mutate(`/api/requests`);
 
       toast({ status: "success", title: "Mise à jour enregistrée." });
       onClose();
@@ -28,6 +28,22 @@ export async function fetcher(url: string) {
   return res.json();
 }
 
+export type Page<T> = { items: T[]; nextCursor: string | null; total: number | null };
+
+/** One page of a cursor-paginated list: the body plus the X-Next-Cursor / X-Total-Count headers. */
+export async function pageFetcher<T>(url: string): Promise<Page<T>> {
+  const finalUrl = url.startsWith("/") ? url : `/${url}`;
+
+  const res = await fetch(finalUrl);
+  if (!res.ok) throw new Error(await res.text());
+  const total = res.headers.get("X-Total-Count");
+  return {
+    items: await res.json(),
+    nextCursor: res.headers.get("X-Next-Cursor"),
+    total: total === null ? null : Number(total),
+  };
+}
+
 export async function postJson(url: string, data: any) {
   const finalUrl = url.startsWith("/") ? url : `/${url}`;
 